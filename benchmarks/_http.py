@@ -0,0 +1,178 @@
+"""
+A small asyncio HTTP/1.1 load generator for the benchmarks that drive a gunicorn server.
+
+Every simulated client holds one keep-alive connection and sends requests back to back, so concurrency is
+the number of open connections. One event loop comfortably opens thousands of them; at very high rates the
+client itself may become the bottleneck, which shows up as the server's CPU sitting idle.
+"""
+import asyncio
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def request(self, method, path, headers=None, body=b''):
+        """Sends one request and returns (status, body), reconnecting when the server closed the connection"""
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}', f'Content-Length: {len(body)}']
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        self._writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+
+        status, response_headers = await self._read_head()
+        if response_headers.get('transfer-encoding') == 'chunked':
+            data = await self._read_chunked()
+        else:
+            data = await self._reader.readexactly(int(response_headers.get('content-length', 0)))
+
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, data
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _read_head(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError('server closed the connection')
+        headers = {}
+        while True:
+            line = (await self._reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return int(status_line.split()[1]), headers
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readline()).split(b';')[0], 16)
+            chunk = await self._reader.readexactly(size + 2)
+            if size == 0:
+                return b''.join(chunks)
+            chunks.append(chunk[:-2])
+
+
+async def _client(host, port, deadline, next_request, latencies, errors):
+    connection = Connection(host, port)
+    while time.monotonic() < deadline:
+        name, method, path, headers, body = next_request()
+        started = time.perf_counter()
+        try:
+            status, _ = await connection.request(method, path, headers, body)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            connection.close()
+            errors[name] = errors.get(name, 0) + 1
+            # a refused or reset connection would otherwise spin
+            await asyncio.sleep(0.01)
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        if status >= 400:
+            errors[name] = errors.get(name, 0) + 1
+        else:
+            latencies.setdefault(name, []).append(elapsed)
+    connection.close()
+
+
+def run_load(host, port, concurrency, duration, next_request, ramp_up=1.0):
+    """
+    Runs `concurrency` keep-alive clients for `duration` seconds. `next_request()` returns
+    (name, method, path, headers, body) for each request; results are summarized per name.
+    Connections are opened over `ramp_up` seconds so the accept backlog is not flooded at once.
+    """
+    latencies, errors = {}, {}
+
+    async def main():
+        deadline = time.monotonic() + duration
+        clients = []
+        for _ in range(concurrency):
+            clients.append(asyncio.ensure_future(_client(host, port, deadline, next_request, latencies, errors)))
+            await asyncio.sleep(ramp_up / concurrency)
+        await asyncio.gather(*clients)
+
+    started = time.monotonic()
+    asyncio.run(main())
+    elapsed = time.monotonic() - started
+
+    names = sorted(set(latencies) | set(errors))
+    summary = {name: summarize(latencies.get(name, []), errors.get(name, 0), elapsed) for name in names}
+    summary['total'] = summarize([value for values in latencies.values() for value in values],
+                                 sum(errors.values()), elapsed)
+    return summary
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {'requests': 0, 'errors': errors, 'rps': 0.0}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'p99_ms': round(_percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2),
+    }
+
+
+def weighted(choices):
+    """A next_request for run_load picking from (request, weight) pairs"""
+    requests = [request for request, _ in choices]
+    weights = [weight for _, weight in choices]
+    return lambda: random.choices(requests, weights)[0]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def raise_open_files_limit():
+    """Lifts the soft limit on open files to the hard one, for runs with thousands of connections"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def start_gunicorn(port, env, timeout=30):
+    """Starts `gunicorn -c gunicorn_config.py core.server:app` with `env` on top of ours, once it accepts"""
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', '--access-logfile', '/dev/null',
+         'core.server:app'],
+        env={**os.environ, 'GUNICORN_PORT': str(port), 'GUNICORN_LOG_LEVEL': 'warning', **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'gunicorn did not start with {env}')
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
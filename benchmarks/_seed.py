@@ -0,0 +1,70 @@
+"""
+Databases for the benchmarks, seeded with core.libs.seeding.Seeder, and the X-Principal headers of their users.
+
+Seeding uses the same random seed every run, so a benchmark's data is the same from one commit to the next.
+"""
+import json
+import random
+
+from sqlalchemy import create_engine, select
+
+from core import db
+from core.libs.seeding import Seeder
+from core.models.assignments import Assignment
+from core.models.principals import Principal
+from core.models.students import Student
+from core.models.teachers import Teacher
+
+RANDOM_SEED = 0
+ROLES = {'student': Student, 'teacher': Teacher, 'principal': Principal}
+
+
+def create_tables(uri):
+    """Creates the tables of `uri` that are missing"""
+    engine = create_engine(uri)
+    try:
+        db.metadata.create_all(engine)
+    finally:
+        engine.dispose()
+
+
+def seed(uri, students=0, teachers=0, principals=0, assignments=0, **options):
+    """Creates the tables of `uri` where missing and adds rows to them, see Seeder.seed for `options`"""
+    create_tables(uri)
+    engine = create_engine(uri)
+    try:
+        return Seeder(engine, rng=random.Random(RANDOM_SEED)).seed(students, teachers, principals, assignments,
+                                                                    **options)
+    finally:
+        engine.dispose()
+
+
+def principals(uri):
+    """{'student' | 'teacher' | 'principal': [(id, user id), ...] by id}"""
+    engine = create_engine(uri)
+    try:
+        with engine.connect() as connection:
+            return {role: connection.execute(
+                select(model.__table__.c.id, model.__table__.c.user_id).order_by(model.__table__.c.id)
+            ).all() for role, model in ROLES.items()}
+    finally:
+        engine.dispose()
+
+
+def headers(role, _id, user_id):
+    """The X-Principal header of the `role` with id `_id`"""
+    return {'X-Principal': json.dumps({f'{role}_id': _id, 'user_id': user_id})}
+
+
+def assignments(uri, columns=('id',), **where):
+    """The `columns` of the assignments whose columns equal the values of `where`, by id"""
+    table = Assignment.__table__
+    query = select(*(table.c[column] for column in columns)).order_by(table.c.id)
+    for column, value in where.items():
+        query = query.where(getattr(Assignment, column) == value)
+    engine = create_engine(uri)
+    try:
+        with engine.connect() as connection:
+            return connection.execute(query).all()
+    finally:
+        engine.dispose()
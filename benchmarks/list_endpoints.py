@@ -0,0 +1,89 @@
+"""
+Latency of the per-role assignment listings as the assignments table grows.
+
+The rows owned by the benchmarked student and teacher stay fixed while the
+rest of the table grows, so with the listing indexes in place the latency
+should stay flat across sizes.
+
+    python -m benchmarks.list_endpoints --sizes 1000 10000 100000
+    python -m benchmarks.list_endpoints --no-indexes   # baseline without indexes
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks import _seed
+from core import app, db, query_cache
+
+OWNED_ROWS = 50
+STUDENTS = 100
+TEACHERS = 20
+
+
+def _prepare(uri, n_rows):
+    """Seeds `n_rows` submitted and graded assignments, and returns the headers of the owners being listed"""
+    # student 1 and teacher 1 own a fixed slice of the table; the rest is noise spread over the others
+    _seed.seed(uri, students=1, teachers=1, principals=1, assignments=min(n_rows, OWNED_ROWS), draft_ratio=0)
+    _seed.seed(uri, students=STUDENTS - 1, teachers=TEACHERS - 1, assignments=max(n_rows - OWNED_ROWS, 0), skew=0,
+               draft_ratio=0)
+    return {role: _seed.headers(role, *ids[0]) for role, ids in _seed.principals(uri).items()}
+
+
+def _time_route(client, path, headers, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.json
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def run(sizes, repeat, indexes):
+    import core.server  # noqa: F401 registers the blueprints
+    from core.models.assignments import Assignment
+
+    # time the queries themselves rather than the listing cache
+    query_cache.enabled = False
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            uri = 'sqlite:///' + os.path.join(tmp, 'bench.sqlite3')
+            app.config['SQLALCHEMY_DATABASE_URI'] = uri
+            with app.app_context():
+                db.create_all()
+                if not indexes:
+                    for index in Assignment.__table__.indexes:
+                        index.drop(db.engine)
+                owners = _prepare(uri, size)
+                routes = {f'/{role}/assignments': headers for role, headers in owners.items()}
+
+                client = app.test_client()
+                for path, headers in routes.items():
+                    results.append({'rows': size, 'route': path, **_time_route(client, path, headers, repeat)})
+                db.session.remove()
+                db.engine.dispose()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--no-indexes', dest='indexes', action='store_false')
+    args = parser.parse_args()
+
+    for row in run(args.sizes, args.repeat, args.indexes):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+End-to-end load test of `core.server:app` under gunicorn, reporting latency percentiles per route.
+
+A fresh SQLite file is seeded with two students, two teachers, a principal and `--assignments` assignments
+split between them, a third each draft, submitted and graded. Then `--concurrency` keep-alive clients send a
+weighted mix of requests for `--duration` seconds as those users.
+
+    python -m benchmarks.load --assignments 10000 --concurrency 50 --duration 20
+    python -m benchmarks.load --mix student-list=3 student-draft=1 --worker-class gevent --output load.json
+
+The JSON report holds throughput, errors and p50/p95/p99/max latency per route next to the commit and
+settings it ran with, so reports can be compared between commits and worker configurations.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import tempfile
+
+from benchmarks import _seed
+from benchmarks._http import free_port, raise_open_files_limit, run_load, start_gunicorn
+from core.models.assignments import AssignmentStateEnum
+
+JSON = {'Content-Type': 'application/json'}
+GRADES = ('A', 'B', 'C', 'D')
+
+DEFAULT_MIX = {
+    'student-list': 30,
+    'teacher-list': 20,
+    'principal-list': 20,
+    'principal-teachers': 10,
+    'student-draft': 10,
+    'principal-grade': 10,
+}
+
+
+def _prepare(uri, n_assignments):
+    """Seeds the database and returns the users' headers by role and the ids of the graded assignments"""
+    _seed.seed(uri, students=2, teachers=2, principals=1, assignments=n_assignments, skew=0,
+               draft_ratio=1 / 3, graded_ratio=1 / 2)
+    users = {role: [_seed.headers(role, _id, user_id) for _id, user_id in ids]
+             for role, ids in _seed.principals(uri).items()}
+    graded_ids = [_id for _id, in _seed.assignments(uri, state=AssignmentStateEnum.GRADED)]
+    return users, graded_ids
+
+
+def _workload(mix, users, graded_ids):
+    """A next_request for run_load that picks routes by their weight in `mix`"""
+    students, teachers, (principal, *_) = users['student'], users['teacher'], users['principal']
+
+    def list_principal():
+        return 'GET /principal/assignments', 'GET', '/principal/assignments', principal, b''
+
+    def grade():
+        if not graded_ids:
+            return list_principal()
+        body = json.dumps({'id': random.choice(graded_ids), 'grade': random.choice(GRADES)}).encode()
+        return 'POST /principal/assignments/grade', 'POST', '/principal/assignments/grade', {**principal, **JSON}, body
+
+    builders = {
+        'student-list': lambda: ('GET /student/assignments', 'GET', '/student/assignments', random.choice(students), b''),
+        'teacher-list': lambda: ('GET /teacher/assignments', 'GET', '/teacher/assignments', random.choice(teachers), b''),
+        'principal-list': list_principal,
+        'principal-teachers': lambda: ('GET /principal/teachers', 'GET', '/principal/teachers', principal, b''),
+        'student-draft': lambda: ('POST /student/assignments', 'POST', '/student/assignments',
+                                  {**random.choice(students), **JSON}, b'{"content": "load test draft"}'),
+        'principal-grade': grade,
+    }
+    unknown = set(mix) - set(builders)
+    if unknown:
+        raise SystemExit(f'unknown routes in --mix: {sorted(unknown)}, choose from {sorted(builders)}')
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    return lambda: builders[random.choices(names, weights)[0]]()
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(mix, assignments, concurrency, duration, worker_class, workers, threads):
+    raise_open_files_limit()
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = 'sqlite:///' + os.path.join(tmp, 'load.sqlite3')
+        users, graded_ids = _prepare(uri, assignments)
+        port = free_port()
+        server = start_gunicorn(port, {
+            'DATABASE_URL': uri,
+            'GUNICORN_WORKER_CLASS': worker_class,
+            'GUNICORN_NUMBER_WORKERS': str(workers),
+            'GUNICORN_NUMBER_WORKER_THREADS': str(threads),
+            'GUNICORN_NUMBER_WORKER_CONNECTIONS': str(max(concurrency, 1000)),
+            'GUNICORN_BACKLOG': str(max(concurrency, 2048)),
+        })
+        try:
+            routes = run_load('127.0.0.1', port, concurrency, duration, _workload(mix, users, graded_ids))
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        'commit': _commit(),
+        'worker_class': worker_class,
+        'workers': workers,
+        'threads': threads,
+        'concurrency': concurrency,
+        'duration': duration,
+        'assignments': assignments,
+        'mix': mix,
+        'routes': routes,
+    }
+
+
+def _parse_mix(pairs):
+    mix = {}
+    for pair in pairs:
+        name, _, weight = pair.partition('=')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', nargs='+', metavar='ROUTE=WEIGHT', help=f'default: {DEFAULT_MIX}')
+    parser.add_argument('--assignments', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--worker-class', default='sync')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--output', help='write the report to this file instead of stdout')
+    args = parser.parse_args()
+
+    report = run(_parse_mix(args.mix) if args.mix else DEFAULT_MIX, args.assignments, args.concurrency,
+                 args.duration, args.worker_class, args.workers, args.threads)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
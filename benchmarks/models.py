@@ -0,0 +1,213 @@
+"""
+Microbenchmarks of the model layer's hot paths over seeded tables of 1k, 100k and 1M assignments.
+
+Every operation is called as its route calls it, in a fresh session, with the listing cache off, and its
+time is split in three:
+
+- query: the SQL it issued, replayed straight on the driver and fully fetched
+- orm: the rest of the model call, i.e. building queries, hydrating rows and flushing
+- serialize: dumping the result as the route does and encoding it to JSON
+
+Writes are rolled back after each call, so every iteration sees the same rows. Medians are reported in ms.
+
+    python -m benchmarks.models --save-baseline                  # record benchmarks/models_baseline.json
+    python -m benchmarks.models --sizes 1000 100000 --threshold 0.15
+
+Without --save-baseline, results are compared with the baseline and the run exits with status 1 when any
+phase got slower by more than --threshold (and by more than --min-delta-ms, to ignore noise on tiny phases).
+Baselines only compare runs on the same machine.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from benchmarks import _seed
+from core import app, db, query_cache
+from core.libs import serialization
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'models_baseline.json')
+PHASES = ('query_ms', 'orm_ms', 'serialize_ms', 'total_ms')
+STUDENTS = 1000
+TEACHERS = 100
+
+
+def _prepare(uri, n_rows):
+    """
+    Seeds `n_rows` assignments, a third each draft, submitted and graded, spread over the students and teachers.
+    Returns the principals of the operations: the owner of the first draft and the teacher of the first submission.
+    """
+    from core.apis.decorators import AuthPrincipal
+    from core.models.assignments import AssignmentStateEnum
+
+    _seed.seed(uri, students=STUDENTS, teachers=TEACHERS, principals=1, assignments=n_rows, skew=0,
+               draft_ratio=1 / 3, graded_ratio=1 / 2)
+    users = {role: dict(ids) for role, ids in _seed.principals(uri).items()}
+    (draft_id, student_id), *_ = _seed.assignments(uri, ('id', 'student_id'), state=AssignmentStateEnum.DRAFT)
+    (submitted_id, teacher_id), *_ = _seed.assignments(uri, ('id', 'teacher_id'), state=AssignmentStateEnum.SUBMITTED)
+    return (draft_id, AuthPrincipal(user_id=users['student'][student_id], student_id=student_id),
+            submitted_id, AuthPrincipal(user_id=users['teacher'][teacher_id], teacher_id=teacher_id))
+
+
+def _operations(draft_id, student, submitted_id, teacher):
+    """{name: (call, serialize)}, where serialize dumps the call's result as its route does"""
+    from core.apis.assignments.schema import assignment_serializer
+    from core.apis.teachers.schema import TeacherSchema
+    from core.libs.pagination import PageRequest
+    from core.models.assignments import Assignment, GradeEnum
+    from core.models.teachers import Teacher
+
+    columns = assignment_serializer.attributes
+
+    def dump_one(assignment):
+        return serialization.dumps({'data': assignment_serializer.dump(assignment)})
+
+    def dump_page(rows):
+        return serialization.dumps({'data': assignment_serializer.dump_many(rows)})
+
+    return {
+        'Assignment.upsert': (lambda: Assignment.upsert(Assignment(student_id=student.student_id, content='benchmark draft')), dump_one),
+        'Assignment.submit': (lambda: Assignment.submit(draft_id, teacher.teacher_id, student), dump_one),
+        'Assignment.mark_grade': (lambda: Assignment.mark_grade(submitted_id, GradeEnum.A, teacher), dump_one),
+        'Assignment.get_assignments_by_student': (
+            lambda: Assignment.get_assignments_by_student(student.student_id, page=PageRequest(), columns=columns), dump_page),
+        'Assignment.get_assignments_by_teacher': (
+            lambda: Assignment.get_assignments_by_teacher(teacher.teacher_id, page=PageRequest(), columns=columns), dump_page),
+        'Assignment.get_all_submitted_and_graded_assignments': (
+            lambda: Assignment.get_all_submitted_and_graded_assignments(page=PageRequest(), columns=columns), dump_page),
+        'Teacher.get_all_teachers': (
+            Teacher.get_all_teachers, lambda teachers: serialization.dumps({'data': TeacherSchema().dump(teachers, many=True)})),
+    }
+
+
+def _capture_statements(call):
+    """Runs `call` and returns its result with the (statement, parameters, executemany) it sent to the driver"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters, executemany))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        return call(), statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _replay(statements):
+    """Time to run `statements` on a raw driver connection and fetch every row, rolled back afterwards"""
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        started = time.perf_counter()
+        for statement, parameters, executemany in statements:
+            if executemany:
+                cursor.executemany(statement, parameters)
+            else:
+                cursor.execute(statement, parameters)
+            if cursor.description is not None:
+                cursor.fetchall()
+        elapsed = time.perf_counter() - started
+        cursor.close()
+        connection.rollback()
+    finally:
+        connection.close()
+    return elapsed * 1000
+
+
+def _measure(call, serialize, repeat):
+    timings = {phase: [] for phase in PHASES}
+    for iteration in range(repeat + 1):
+        started = time.perf_counter()
+        result, statements = _capture_statements(call)
+        called = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        serialize(result)
+        serialized = (time.perf_counter() - started) * 1000
+        db.session.rollback()
+        db.session.remove()
+
+        query = _replay(statements)
+        if iteration == 0:
+            # warms up connections, statement caches and compiled serializers
+            continue
+        timings['query_ms'].append(query)
+        timings['orm_ms'].append(max(called - query, 0.0))
+        timings['serialize_ms'].append(serialized)
+        timings['total_ms'].append(called + serialized)
+
+    return {phase: round(statistics.median(values), 4) for phase, values in timings.items()}
+
+
+def run(sizes, repeat):
+    query_cache.enabled = False
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            uri = 'sqlite:///' + os.path.join(tmp, 'bench.sqlite3')
+            app.config['SQLALCHEMY_DATABASE_URI'] = uri
+            with app.app_context():
+                principals = _prepare(uri, size)
+                for name, (call, serialize) in _operations(*principals).items():
+                    results.append({'rows': size, 'operation': name, **_measure(call, serialize, repeat)})
+                db.engine.dispose()
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """The phases of `results` slower than in `baseline` by more than both `threshold` and `min_delta_ms`"""
+    previous = {(row['rows'], row['operation']): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row['rows'], row['operation']))
+        if before is None:
+            continue
+        for phase in PHASES:
+            if phase not in before:
+                continue
+            delta = row[phase] - before[phase]
+            if delta > min_delta_ms and row[phase] > before[phase] * (1 + threshold):
+                regressions.append({'rows': row['rows'], 'operation': row['operation'], 'phase': phase,
+                                    'baseline': before[phase], 'current': row[phase]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, 0.2 being 20%%')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    for row in results:
+        print(json.dumps(row))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f'baseline saved to {args.baseline}', file=sys.stderr)
+        return
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --save-baseline first', file=sys.stderr)
+        return
+
+    with open(args.baseline) as baseline:
+        regressions = compare(results, json.load(baseline), args.threshold, args.min_delta_ms)
+    for regression in regressions:
+        print(json.dumps({'regression': regression}), file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Serialization cost of assignment lists: AssignmentSchema.dump and Flask's json encoder, as the
+responses used to be built, against the compiled serializer and orjson, from both ORM objects
+and row tuples.
+
+    python -m benchmarks.serialization --sizes 10 1000 100000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from collections import namedtuple
+
+from flask import json as flask_json
+
+from core import app
+from core.apis.assignments.schema import AssignmentSchema, assignment_serializer
+from core.libs import helpers, serialization
+from core.models.assignments import Assignment, AssignmentStateEnum, GradeEnum
+
+
+def _assignments(size):
+    now = helpers.get_utc_now()
+    return [
+        Assignment(
+            id=i, student_id=random.randint(1, 100), teacher_id=random.randint(1, 20), content='benchmark content',
+            grade=random.choice(list(GradeEnum)), state=random.choice([AssignmentStateEnum.SUBMITTED, AssignmentStateEnum.GRADED]),
+            created_at=now, updated_at=now, version=1,
+        )
+        for i in range(1, size + 1)
+    ]
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def run(sizes, repeat):
+    Row = namedtuple('Row', assignment_serializer.attributes)
+    results = []
+    with app.app_context():
+        for size in sizes:
+            assignments = _assignments(size)
+            rows = [Row(*(getattr(a, attribute) for attribute in Row._fields)) for a in assignments]
+            times = max(1, repeat * 10 // max(size, 10))
+            results.append({
+                'items': size,
+                'schema_ms': _time(lambda: flask_json.dumps({'data': AssignmentSchema().dump(assignments, many=True)}), times),
+                'compiled_objects_ms': _time(lambda: serialization.dumps({'data': assignment_serializer.dump_many(assignments)}), times),
+                'compiled_rows_ms': _time(lambda: serialization.dumps({'data': assignment_serializer.dump_many(rows)}), times),
+                'encoder': 'orjson' if serialization.orjson is not None else 'flask',
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    for row in run(args.sizes, args.repeat):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput and latency of gunicorn's sync, gthread and gevent workers as concurrent connections grow.
+
+Each run starts `gunicorn -c gunicorn_config.py` on a freshly seeded SQLite file and holds `--concurrency`
+keep-alive connections open against it, mostly listing a student's assignments with some draft writes. The
+sync worker serves one connection at a time per process, so at high concurrency most connections wait in
+the accept backlog; gthread is capped by its threads; gevent multiplexes every connection on one hub.
+
+    python -m benchmarks.worker_classes --concurrency 50 500 5000 --duration 10
+
+5000 connections need an open files limit above that (`ulimit -n`), which this raises when allowed.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from benchmarks import _seed
+from benchmarks._http import free_port, raise_open_files_limit, run_load, start_gunicorn, weighted
+
+WORKER_CLASSES = ('sync', 'gthread', 'gevent')
+STUDENTS = 100
+ROWS_PER_STUDENT = 20
+
+
+def _prepare(uri):
+    """Seeds drafts for the students and returns their headers"""
+    # assignments need a teacher to be seeded, though drafts have none
+    _seed.seed(uri, students=STUDENTS, teachers=1, assignments=STUDENTS * ROWS_PER_STUDENT, draft_ratio=1)
+    return [_seed.headers('student', _id, user_id) for _id, user_id in _seed.principals(uri)['student']]
+
+
+def _requests(students, write_ratio):
+    choices = []
+    for principal in students:
+        headers = {**principal, 'Content-Type': 'application/json'}
+        choices.append((('list', 'GET', '/student/assignments', headers, b''), 1 - write_ratio))
+        choices.append((('draft', 'POST', '/student/assignments', headers, b'{"content": "benchmark draft"}'), write_ratio))
+    return weighted(choices)
+
+
+def _env(worker_class, uri, workers, threads, concurrency):
+    return {
+        'DATABASE_URL': uri,
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'GUNICORN_NUMBER_WORKERS': str(workers),
+        'GUNICORN_NUMBER_WORKER_THREADS': str(threads if worker_class == 'gthread' else 1),
+        'GUNICORN_NUMBER_WORKER_CONNECTIONS': str(max(concurrency, 1000)),
+        'GUNICORN_BACKLOG': str(max(concurrency, 2048)),
+    }
+
+
+def run(worker_classes, concurrencies, duration, workers, threads, write_ratio):
+    raise_open_files_limit()
+    results = []
+    for worker_class in worker_classes:
+        for concurrency in concurrencies:
+            with tempfile.TemporaryDirectory() as tmp:
+                uri = 'sqlite:///' + os.path.join(tmp, 'bench.sqlite3')
+                next_request = _requests(_prepare(uri), write_ratio)
+                port = free_port()
+                server = start_gunicorn(port, _env(worker_class, uri, workers, threads, concurrency))
+                try:
+                    summary = run_load('127.0.0.1', port, concurrency, duration, next_request)
+                finally:
+                    server.terminate()
+                    server.wait()
+            results.append({'worker_class': worker_class, 'concurrency': concurrency, **summary['total']})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--worker-class', dest='worker_classes', nargs='+', default=list(WORKER_CLASSES))
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    args = parser.parse_args()
+
+    for row in run(args.worker_classes, args.concurrency, args.duration, args.workers, args.threads,
+                   args.write_ratio):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
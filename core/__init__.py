@@ -1,23 +1,62 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 from sqlite3 import Connection as SQLite3Connection
 
+from core import config
+from core.libs import cooperative
+from core.libs.cache import QueryCache
+from core.libs.memory import MemoryMonitor
+from core.libs.metrics import Registry
+from core.libs.profiling import RequestProfiler, SamplingProfiler
+from core.libs.querystats import QueryStats
+from core.libs.routing import ReadOnlySQLite3Connection, RoutingSQLAlchemy
+from core.libs.tokens import PrincipalTokens
+from core.libs.tracing import Tracer
+
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///./store.sqlite3'
-app.config['SQLALCHEMY_ECHO'] = False
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
+app.config.from_object(config)
+cooperative.install(config.GEVENT_DB_THREADS)
+db = RoutingSQLAlchemy(app)
 migrate = Migrate(app, db)
+metrics = Registry(config.METRICS_DIR, config.METRICS_FLUSH_SECONDS)
+query_cache = QueryCache(config.QUERY_CACHE_MAX_ENTRIES, config.QUERY_CACHE_TTL_SECONDS, config.QUERY_CACHE_ENABLED,
+                         registry=metrics)
+query_cache.listen(Session)
+principal_tokens = PrincipalTokens(config.PRINCIPAL_TOKEN_SECRET, config.PRINCIPAL_ALLOW_UNSIGNED, config.PRINCIPAL_TOKEN_CACHE_SIZE)
+tracer = Tracer(config.TRACE_SINK, config.TRACE_MIN_MS)
+tracer.init_app(app)
+request_profiler = RequestProfiler(config.PROFILE_TOKEN, config.PROFILE_DIR)
+request_profiler.init_app(app)
+sampling_profiler = SamplingProfiler(
+    config.SAMPLING_PROFILER_DIR, config.SAMPLING_PROFILER_HZ, config.SAMPLING_PROFILER_FLUSH_SECONDS,
+    config.SAMPLING_PROFILER_MAX_STACKS, enabled=config.SAMPLING_PROFILER_ENABLED
+)
+query_stats = QueryStats(config.SQL_SLOW_QUERY_MS, config.SQL_REPEATED_STATEMENT_LIMIT, config.SQL_INSTRUMENTATION_ENABLED)
+query_stats.listen(Engine)
+query_stats.init_app(app)
+memory_monitor = MemoryMonitor(
+    metrics, config.MEMORY_SNAPSHOT_EVERY_REQUESTS, config.MEMORY_TOP_SITES, config.MEMORY_RECYCLE_GROWTH_MB,
+    config.MEMORY_TRACE_FRAMES, enabled=config.MEMORY_DIAGNOSTICS_ENABLED
+)
+memory_monitor.init_app(app)
 app.test_client()
 
 
-# this is to enforce fk (not done by default in sqlite3)
+# this is to enforce fk (not done by default in sqlite3) and tune every new sqlite connection
 @event.listens_for(Engine, "connect")
 def _set_sqlite_pragma(dbapi_connection, connection_record):
     if isinstance(dbapi_connection, SQLite3Connection):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON;")
+        if isinstance(dbapi_connection, ReadOnlySQLite3Connection):
+            cursor.execute("PRAGMA query_only=ON;")
+        else:
+            cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE};")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS};")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS};")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE};")
+        cursor.execute(f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE};")
         cursor.close()
@@ -1,19 +1,23 @@
-from flask import Blueprint
-from core import db
+from flask import Blueprint, request
 from core.apis import decorators
 from core.apis.responses import APIResponse
+from core.libs import tracing, transactions
+from core.libs.pagination import PageRequest
 from core.models.assignments import Assignment
 
-from .schema import AssignmentSchema, AssignmentGradeSchema
+from .schema import assignment_grade_validator, assignment_serializer, load_many
 principal_assignments_resources = Blueprint('principal_assignments_resources', __name__)
 
 @principal_assignments_resources.route('/assignments', methods=['GET'], strict_slashes=False)
 @decorators.authenticate_principal
 def get_assignments(p):
 
-    all_submitted_and_graded_assignments = Assignment.get_all_submitted_and_graded_assignments()
-    all_submitted_and_graded_assignments_dump = AssignmentSchema().dump(all_submitted_and_graded_assignments, many=True)
-    return APIResponse.respond(data=all_submitted_and_graded_assignments_dump)
+    page = PageRequest.from_request(request)
+    with tracing.span('model'):
+        all_submitted_and_graded_assignments = Assignment.get_all_submitted_and_graded_assignments(
+            page=page, columns=assignment_serializer.attributes
+        )
+    return APIResponse.respond_page(all_submitted_and_graded_assignments, page, assignment_serializer)
 
 
 @principal_assignments_resources.route('/assignments/grade', methods=['POST'], strict_slashes=False)
@@ -21,13 +25,29 @@ def get_assignments(p):
 @decorators.authenticate_principal
 def grade_or_regrade_assignments(p, incoming_payload):
 
-    grade_or_regrade_assignment_payload = AssignmentGradeSchema().load(incoming_payload)
-    graded_or_regraded_assignment = Assignment.mark_grade(
-        _id=grade_or_regrade_assignment_payload.id,
-        grade=grade_or_regrade_assignment_payload.grade,
-        auth_principal=p,
-    )
+    grade_or_regrade_assignment_payload = assignment_grade_validator.load(incoming_payload)
 
-    db.session.commit()
-    graded_or_regraded_assignment_dump = AssignmentSchema().dump(graded_or_regraded_assignment)
-    return APIResponse.respond(data=graded_or_regraded_assignment_dump)
\ No newline at end of file
+    def mark_grade():
+        graded_or_regraded_assignment = Assignment.mark_grade(
+            _id=grade_or_regrade_assignment_payload.id,
+            grade=grade_or_regrade_assignment_payload.grade,
+            auth_principal=p,
+        )
+        return assignment_serializer.dump(graded_or_regraded_assignment)
+
+    graded_or_regraded_assignment_dump = transactions.run(mark_grade)
+    return APIResponse.respond(data=graded_or_regraded_assignment_dump)
+
+
+@principal_assignments_resources.route('/assignments/grade/bulk', methods=['POST'], strict_slashes=False)
+@decorators.accept_payload
+@decorators.authenticate_principal
+def grade_or_regrade_assignments_bulk(p, incoming_payload):
+
+    grade_or_regrade_assignments_payload = load_many(assignment_grade_validator, incoming_payload)
+
+    def mark_grades():
+        graded_or_regraded_assignments = Assignment.mark_grades(grade_or_regrade_assignments_payload, auth_principal=p)
+        return APIResponse.dump_bulk(graded_or_regraded_assignments, assignment_serializer)
+
+    return APIResponse.respond(data=transactions.run(mark_grades))
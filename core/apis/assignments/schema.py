@@ -3,7 +3,12 @@ from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field
 from marshmallow_enum import EnumField
 from core.models.assignments import Assignment, GradeEnum
 from core.models.teachers import Teacher
+from core.libs import assertions
 from core.libs.helpers import GeneralObject
+from core.libs.serialization import compile_serializer
+from core.libs.validation import compile_validator
+
+MAX_BULK_ITEMS = 500
 
 
 class AssignmentSchema(SQLAlchemyAutoSchema):
@@ -19,6 +24,7 @@ class AssignmentSchema(SQLAlchemyAutoSchema):
     student_id = auto_field(dump_only=True)
     grade = auto_field(dump_only=True)
     state = auto_field(dump_only=True)
+    version = auto_field(dump_only=True)
 
     @post_load
     def initiate_class(self, data_dict, many, partial):
@@ -26,6 +32,10 @@ class AssignmentSchema(SQLAlchemyAutoSchema):
         return Assignment(**data_dict)
 
 
+# dumps assignments in responses, see core/libs/serialization.py
+assignment_serializer = compile_serializer(AssignmentSchema)
+
+
 class AssignmentSubmitSchema(Schema):
     class Meta:
         unknown = EXCLUDE
@@ -50,3 +60,16 @@ class AssignmentGradeSchema(Schema):
     def initiate_class(self, data_dict, many, partial):
         # pylint: disable=unused-argument,no-self-use
         return GeneralObject(**data_dict)
+
+
+# load request payloads like the schemas above, see core/libs/validation.py
+assignment_validator = compile_validator(AssignmentSchema, make=Assignment)
+assignment_submit_validator = compile_validator(AssignmentSubmitSchema)
+assignment_grade_validator = compile_validator(AssignmentGradeSchema)
+
+
+def load_many(validator, incoming_payload):
+    """Loads a bulk payload, a list of at most MAX_BULK_ITEMS objects, in a single validation pass"""
+    assertions.assert_valid(isinstance(incoming_payload, list) and len(incoming_payload) <= MAX_BULK_ITEMS,
+                            f'payload should be a list of at most {MAX_BULK_ITEMS} items')
+    return validator.load(incoming_payload, many=True)
@@ -1,20 +1,25 @@
-from flask import Blueprint, jsonify
-from core import db
+from flask import Blueprint, jsonify, request
 from core.apis import decorators
 from core.apis.responses import APIResponse
+from core.libs import transactions
+from core.libs.pagination import PageRequest
 from core.models.assignments import Assignment
 
-from .schema import AssignmentSchema, AssignmentSubmitSchema
+from .schema import assignment_serializer, assignment_submit_validator, assignment_validator, load_many
 student_assignments_resources = Blueprint('student_assignments_resources', __name__)
 
 
 @student_assignments_resources.route('/assignments', methods=['GET'], strict_slashes=False)
 @decorators.authenticate_principal
 def list_assignments(p):
-    """Returns list of assignments"""
-    students_assignments = Assignment.get_assignments_by_student(p.student_id)
-    students_assignments_dump = AssignmentSchema().dump(students_assignments, many=True)
-    return APIResponse.respond(data=students_assignments_dump)
+    """Returns a page of assignments, or 304 if the client's copy is current"""
+    page = PageRequest.from_request(request)
+    return APIResponse.respond_page_if_modified(
+        page,
+        Assignment.get_listing_validator('student_id', p.student_id),
+        lambda: Assignment.get_assignments_by_student(p.student_id, page=page, columns=assignment_serializer.attributes),
+        assignment_serializer,
+    )
 
 
 @student_assignments_resources.route('/assignments', methods=['POST'], strict_slashes=False)
@@ -22,35 +27,67 @@ def list_assignments(p):
 @decorators.authenticate_principal
 def upsert_assignment(p, incoming_payload):
     """Create or Edit an assignment"""
-    assignment = AssignmentSchema().load(incoming_payload)
+    assignment = assignment_validator.load(incoming_payload)
     assignment.student_id = p.student_id
 
     if assignment.content is not None:
-        upserted_assignment = Assignment.upsert(assignment)
-        db.session.commit()
-        upserted_assignment_dump = AssignmentSchema().dump(upserted_assignment)
+        def upsert():
+            upserted_assignment = Assignment.upsert(assignment)
+            return assignment_serializer.dump(upserted_assignment)
+
+        upserted_assignment_dump = transactions.run(upsert)
         return APIResponse.respond(data=upserted_assignment_dump)
     else:
         return jsonify(error='Content is null ! Content Cannot be null'), 400
 
 
+@student_assignments_resources.route('/assignments/bulk', methods=['POST'], strict_slashes=False)
+@decorators.accept_payload
+@decorators.authenticate_principal
+def upsert_assignments(p, incoming_payload):
+    """Create or Edit many assignments in one transaction"""
+    assignments = load_many(assignment_validator, incoming_payload)
+
+    def upsert_many():
+        upserted_assignments = Assignment.upsert_many(assignments, student_id=p.student_id)
+        return APIResponse.dump_bulk(upserted_assignments, assignment_serializer)
+
+    return APIResponse.respond(data=transactions.run(upsert_many))
+
+
 @student_assignments_resources.route('/assignments/submit', methods=['POST'], strict_slashes=False)
 @decorators.accept_payload
 @decorators.authenticate_principal
 def submit_assignment(p, incoming_payload):
     """Submit an assignment"""
-    submit_assignment_payload = AssignmentSubmitSchema().load(incoming_payload)
+    submit_assignment_payload = assignment_submit_validator.load(incoming_payload)
 
-    submitted_assignment = Assignment.submit(
-        _id=submit_assignment_payload.id,
-        teacher_id=submit_assignment_payload.teacher_id,
-        auth_principal=p
-    )
+    def submit():
+        submitted_assignment = Assignment.submit(
+            _id=submit_assignment_payload.id,
+            teacher_id=submit_assignment_payload.teacher_id,
+            auth_principal=p
+        )
+        return submitted_assignment and assignment_serializer.dump(submitted_assignment)
+
+    submitted_assignment_dump = transactions.run(submit)
 
     # Check if the assignment is valid for submission
-    if not submitted_assignment:
+    if not submitted_assignment_dump:
         return jsonify(error='Assignment cannot be submitted'), 400
 
-    db.session.commit()
-    submitted_assignment_dump = AssignmentSchema().dump(submitted_assignment)
     return APIResponse.respond(data=submitted_assignment_dump)
+
+
+@student_assignments_resources.route('/assignments/submit/bulk', methods=['POST'], strict_slashes=False)
+@decorators.accept_payload
+@decorators.authenticate_principal
+def submit_assignments(p, incoming_payload):
+    """Submit many assignments in one transaction"""
+    submit_assignments_payload = load_many(assignment_submit_validator, incoming_payload)
+
+    def submit_many():
+        submitted_assignments = Assignment.submit_many(submit_assignments_payload, auth_principal=p)
+        return APIResponse.dump_bulk(submitted_assignments, assignment_serializer)
+
+    return APIResponse.respond(data=transactions.run(submit_many))
@@ -1,20 +1,25 @@
-from flask import Blueprint
-from core import db
+from flask import Blueprint, request
 from core.apis import decorators
 from core.apis.responses import APIResponse
+from core.libs import transactions
+from core.libs.pagination import PageRequest
 from core.models.assignments import Assignment
 
-from .schema import AssignmentSchema, AssignmentGradeSchema
+from .schema import assignment_grade_validator, assignment_serializer, load_many
 teacher_assignments_resources = Blueprint('teacher_assignments_resources', __name__)
 
 
 @teacher_assignments_resources.route('/assignments', methods=['GET'], strict_slashes=False)
 @decorators.authenticate_principal
 def list_assignments(p):
-    """Returns list of assignments"""
-    teachers_assignments = Assignment.get_assignments_by_teacher(p.teacher_id)
-    teachers_assignments_dump = AssignmentSchema().dump(teachers_assignments, many=True)
-    return APIResponse.respond(data=teachers_assignments_dump)
+    """Returns a page of assignments, or 304 if the client's copy is current"""
+    page = PageRequest.from_request(request)
+    return APIResponse.respond_page_if_modified(
+        page,
+        Assignment.get_listing_validator('teacher_id', p.teacher_id),
+        lambda: Assignment.get_assignments_by_teacher(p.teacher_id, page=page, columns=assignment_serializer.attributes),
+        assignment_serializer,
+    )
 
 
 @teacher_assignments_resources.route('/assignments/grade', methods=['POST'], strict_slashes=False)
@@ -22,13 +27,29 @@ def list_assignments(p):
 @decorators.authenticate_principal
 def grade_assignment(p, incoming_payload):
     """Grade an assignment"""
-    grade_assignment_payload = AssignmentGradeSchema().load(incoming_payload)
+    grade_assignment_payload = assignment_grade_validator.load(incoming_payload)
 
-    graded_assignment = Assignment.mark_grade(
-        _id=grade_assignment_payload.id,
-        grade=grade_assignment_payload.grade,
-        auth_principal=p
-    )
-    db.session.commit()
-    graded_assignment_dump = AssignmentSchema().dump(graded_assignment)
+    def mark_grade():
+        graded_assignment = Assignment.mark_grade(
+            _id=grade_assignment_payload.id,
+            grade=grade_assignment_payload.grade,
+            auth_principal=p
+        )
+        return assignment_serializer.dump(graded_assignment)
+
+    graded_assignment_dump = transactions.run(mark_grade)
     return APIResponse.respond(data=graded_assignment_dump)
+
+
+@teacher_assignments_resources.route('/assignments/grade/bulk', methods=['POST'], strict_slashes=False)
+@decorators.accept_payload
+@decorators.authenticate_principal
+def grade_assignments_bulk(p, incoming_payload):
+    """Grade many assignments in one transaction"""
+    grade_assignments_payload = load_many(assignment_grade_validator, incoming_payload)
+
+    def mark_grades():
+        graded_assignments = Assignment.mark_grades(grade_assignments_payload, auth_principal=p)
+        return APIResponse.dump_bulk(graded_assignments, assignment_serializer)
+
+    return APIResponse.respond(data=transactions.run(mark_grades))
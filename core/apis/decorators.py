@@ -1,8 +1,22 @@
-import json
-from flask import request
-from core.libs import assertions
+from flask import g, request
+from core import config, db, principal_tokens
+from core.libs import assertions, tracing
+from core.libs.directory import PrincipalDirectory
+from core.models.principals import Principal
+from core.models.students import Student
+from core.models.teachers import Teacher
+from core.models.users import User
 from functools import wraps
 
+principal_directory = PrincipalDirectory(
+    lambda: db.engine,
+    User,
+    {'student_id': Student, 'teacher_id': Teacher, 'principal_id': Principal},
+    refresh_seconds=config.PRINCIPAL_DIRECTORY_REFRESH_SECONDS,
+    reload_seconds=config.PRINCIPAL_DIRECTORY_RELOAD_SECONDS,
+    enabled=config.PRINCIPAL_DIRECTORY_ENABLED
+)
+
 
 class AuthPrincipal:
     def __init__(self, user_id, student_id=None, teacher_id=None, principal_id=None):
@@ -15,32 +29,52 @@ class AuthPrincipal:
 def accept_payload(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        incoming_payload = request.json
+        with tracing.span('payload'):
+            incoming_payload = request.json
         return func(incoming_payload, *args, **kwargs)
     return wrapper
 
 
+# the principal attribute each url prefix requires, resolved once per url rule
+ROLES = {
+    'student': ('student_id', 'requester should be a student'),
+    'teacher': ('teacher_id', 'requester should be a teacher'),
+    'principal': ('principal_id', 'requester should be a principal'),
+}
+_roles_by_rule = {}
+
+
+def _required_role(rule):
+    role = _roles_by_rule.get(rule)
+    if role is None:
+        role = _roles_by_rule[rule] = ROLES.get(rule.lstrip('/').partition('/')[0], ())
+    return role
+
+
 def authenticate_principal(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        p_str = request.headers.get('X-Principal')
-        assertions.assert_auth(p_str is not None, 'principal not found')
-        p_dict = json.loads(p_str)
-        p = AuthPrincipal(
-            user_id=p_dict['user_id'],
-            student_id=p_dict.get('student_id'),
-            teacher_id=p_dict.get('teacher_id'),
-            principal_id=p_dict.get('principal_id')
-        )
-
-        if request.path.startswith('/student'):
-            assertions.assert_true(p.student_id is not None, 'requester should be a student')
-        elif request.path.startswith('/teacher'):
-            assertions.assert_true(p.teacher_id is not None, 'requester should be a teacher')
-        elif request.path.startswith('/principal'):
-            assertions.assert_true(p.principal_id is not None, 'requester should be a principal')
-        else:
-            assertions.assert_found(None, 'No such api')
+        with tracing.span('auth'):
+            p_str = request.headers.get('X-Principal')
+            assertions.assert_auth(p_str is not None, 'principal not found')
+            user_id, student_id, teacher_id, principal_id = principal_tokens.verify(p_str)
+            p = AuthPrincipal(
+                user_id=user_id,
+                student_id=student_id,
+                teacher_id=teacher_id,
+                principal_id=principal_id
+            )
+
+            role = _required_role(request.url_rule.rule)
+            assertions.assert_found(role or None, 'No such api')
+            attribute, message = role
+            assertions.assert_true(getattr(p, attribute) is not None, message)
+            if principal_directory.enabled:
+                assertions.assert_auth(
+                    principal_directory.knows(user_id, student_id=student_id, teacher_id=teacher_id, principal_id=principal_id),
+                    'principal is invalid'
+                )
 
+        g.principal = p
         return func(p, *args, **kwargs)
     return wrapper
@@ -0,0 +1,66 @@
+"""
+Request metrics, exposed on /metrics in the Prometheus text format, see core/libs/metrics.py.
+
+Routes are labelled by their url rule rather than their path, so ids do not multiply the series; requests
+matching no rule share the route label '<unmatched>'.
+"""
+import time
+
+from flask import Blueprint, Response, g, request
+
+from core import metrics
+from core.libs.metrics import TimedQueuePool
+
+REQUEST_LATENCY = metrics.histogram(
+    'http_request_duration_seconds', 'Time to produce a response', ('blueprint', 'route', 'method'))
+REQUESTS = metrics.counter(
+    'http_requests_total', 'Responses by status code', ('blueprint', 'route', 'method', 'status'))
+IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests being handled')
+FYLE_ERRORS = metrics.counter('fyle_errors_total', 'FyleErrors answered, by status code', ('status',))
+SERIALIZATION = metrics.histogram(
+    'response_serialization_seconds', 'Time to dump and encode response bodies', ('route',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+DB_POOL_WAIT = metrics.histogram(
+    'db_pool_checkout_wait_seconds', 'Time to check a connection out of the pool, connecting included',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5))
+
+TimedQueuePool.on_checkout_wait = DB_POOL_WAIT.observe
+
+monitoring_resources = Blueprint('monitoring_resources', __name__)
+
+
+@monitoring_resources.route('/metrics', methods=['GET'])
+def expose_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+def route_label():
+    rule = request.url_rule
+    return '<unmatched>' if rule is None else rule.rule
+
+
+def observe_serialization(started):
+    """Records the time since `started`, a perf_counter, as serialization of the current request's response"""
+    SERIALIZATION.observe(time.perf_counter() - started, route_label())
+
+
+def init_app(app):
+    @app.before_request
+    def _start_timer():
+        IN_FLIGHT.inc()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            labels = (request.blueprint or '', route_label(), request.method)
+            REQUEST_LATENCY.observe(time.perf_counter() - started, *labels)
+            REQUESTS.inc(*labels, str(response.status_code))
+        return response
+
+    @app.teardown_request
+    def _end_request(exc):
+        # teardown also runs for errors no handler answered, and after a streamed body is consumed
+        if g.pop('request_started', None) is not None:
+            IN_FLIGHT.dec()
@@ -1,7 +1,105 @@
-from flask import Response, jsonify, make_response
+import hashlib
+import time
+from datetime import timezone
+
+from flask import Response, request, stream_with_context
+from werkzeug.http import is_resource_modified
+from core.apis.monitoring import observe_serialization
+from core.libs import helpers, serialization, tracing
+from core.libs.exceptions import FyleError
+from core.libs.pagination import NDJSON_MIMETYPE
 
 
 class APIResponse(Response):
     @classmethod
-    def respond(cls, data):
-        return make_response(jsonify(data=data))
+    def respond(cls, data, **meta):
+        started = time.perf_counter()
+        body = serialization.dumps({'data': data, **meta})
+        _serialized(started)
+        return cls(body, mimetype='application/json')
+
+    @staticmethod
+    def dump_bulk(outcomes, serializer):
+        """One result per item of a bulk request, each either the dumped object or its error"""
+        data = []
+        for _id, outcome in outcomes:
+            if isinstance(outcome, FyleError):
+                data.append({'id': _id, 'status_code': outcome.status_code, 'error': outcome.__class__.__name__, 'message': outcome.message})
+            else:
+                data.append({'id': _id, 'status_code': 200, 'data': serializer.dump(outcome)})
+        return data
+
+    @classmethod
+    def respond_page(cls, rows, page, serializer):
+        """Responds with one page of `rows`, or streams all of them as NDJSON if `page` is a stream"""
+        if page.stream:
+            return cls.stream(rows, serializer, page.batch_size)
+
+        rows, next_cursor = page.split(rows)
+        started = time.perf_counter()
+        body = serialization.dumps({'data': serializer.dump_many(rows), 'next_cursor': next_cursor})
+        _serialized(started)
+        return cls(body, mimetype='application/json')
+
+    @classmethod
+    def respond_page_if_modified(cls, page, validator, load, serializer):
+        """
+        Responds like respond_page with the rows of `load()`, unless If-None-Match / If-Modified-Since show
+        the client already has this page, in which case it is a 304 and nothing is loaded. `validator` is
+        the (scope, row count, last updated_at) of the listing.
+        """
+        scope, count, last_updated = validator
+        etag = hashlib.sha1(repr((scope, count, last_updated, page.stream, page.cache_key)).encode()).hexdigest()
+        last_modified = _settled(last_updated)
+
+        if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            with tracing.span('model'):
+                rows = load()
+            response = cls.respond_page(rows, page, serializer)
+        else:
+            response = cls(status=304)
+
+        response.set_etag(etag, weak=True)
+        response.last_modified = last_modified
+        response.vary.update(('Accept', 'X-Principal'))
+        return response
+
+    @classmethod
+    def stream(cls, rows, serializer, batch_size):
+        """Streams `rows` as one JSON document per line, serializing `batch_size` rows at a time"""
+        def generate():
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) == batch_size:
+                    yield _dump_lines(serializer, batch)
+                    batch = []
+            if batch:
+                yield _dump_lines(serializer, batch)
+
+        # the request context, and with it the db session, must outlive the view while rows are read
+        return cls(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+def _settled(last_updated):
+    """
+    `last_updated` if it can be a Last-Modified: HTTP dates have whole seconds, so a listing changed during
+    the current second could change again within it unnoticed by If-Modified-Since.
+    """
+    if last_updated is None:
+        return None
+    if last_updated.tzinfo is not None:
+        last_updated = last_updated.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_updated if last_updated < helpers.get_utc_now().replace(microsecond=0) else None
+
+
+def _dump_lines(serializer, rows):
+    started = time.perf_counter()
+    lines = b''.join(serialization.dumps(item) + b'\n' for item in serializer.dump_many(rows))
+    _serialized(started)
+    return lines
+
+
+def _serialized(started):
+    observe_serialization(started)
+    tracing.record('serialization', started)
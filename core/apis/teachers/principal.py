@@ -2,6 +2,7 @@ from flask import Blueprint
 from core import db
 from core.apis import decorators
 from core.apis.responses import APIResponse
+from core.libs import tracing
 from core.models.teachers import Teacher
 
 from .schema import TeacherSchema
@@ -12,6 +13,7 @@ principal_teachers_resources = Blueprint('principal_teachers_resources', __name_
 @decorators.authenticate_principal
 def list_teachers(p):
     """Returns list of teachers"""
-    teachers_list = Teacher.get_all_teachers()
+    with tracing.span('model'):
+        teachers_list = Teacher.get_all_teachers()
     teachers_list_dump = TeacherSchema().dump(teachers_list, many=True)
     return APIResponse.respond(data=teachers_list_dump)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import random
+import time
+
+import click
+
+from core import app, db, principal_tokens
+from core.libs import seeding
+
+
+@app.cli.command('principal-token')
+@click.option('--user-id', type=int, required=True)
+@click.option('--student-id', type=int)
+@click.option('--teacher-id', type=int)
+@click.option('--principal-id', type=int)
+@click.option('--ttl', type=int, help='seconds until the token expires, never by default')
+def principal_token(user_id, student_id, teacher_id, principal_id, ttl):
+    """Prints a signed X-Principal token, using PRINCIPAL_TOKEN_SECRET"""
+    if principal_tokens.secret is None:
+        raise click.ClickException('PRINCIPAL_TOKEN_SECRET is not set')
+
+    click.echo(principal_tokens.sign({
+        'user_id': user_id, 'student_id': student_id, 'teacher_id': teacher_id, 'principal_id': principal_id,
+    }, ttl=ttl))
+
+
+@app.cli.command('seed')
+@click.option('--students', type=int, default=1000, show_default=True)
+@click.option('--teachers', type=int, default=100, show_default=True)
+@click.option('--principals', type=int, default=1, show_default=True)
+@click.option('--assignments', type=int, default=1000000, show_default=True)
+@click.option('--skew', type=float, default=1.0, show_default=True,
+              help='power-law exponent of submissions per teacher, 0 spreads them evenly')
+@click.option('--grades', default='A=30,B=35,C=25,D=10', show_default=True, help='relative weight of each grade')
+@click.option('--draft-ratio', type=float, default=0.2, show_default=True)
+@click.option('--graded-ratio', type=float, default=0.6, show_default=True, help='share of submissions already graded')
+@click.option('--batch-size', type=int, default=50000, show_default=True)
+@click.option('--transaction-rows', type=int, default=1000000, show_default=True)
+@click.option('--random-seed', type=int, help='makes the generated data reproducible')
+def seed(students, teachers, principals, assignments, skew, grades, draft_ratio, graded_ratio, batch_size,
+         transaction_rows, random_seed):
+    """Adds synthetic users, students, teachers, principals and assignments to the database"""
+    try:
+        grade_weights = seeding.parse_weights(grades)
+    except ValueError:
+        raise click.BadParameter(f'expected e.g. A=30,B=35,C=25,D=10, got {grades}', param_hint='--grades')
+
+    seeder = seeding.Seeder(db.engine, batch_size, transaction_rows, random.Random(random_seed))
+    started = time.perf_counter()
+    try:
+        counts = seeder.seed(students, teachers, principals, assignments, skew, grade_weights, draft_ratio, graded_ratio)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+
+    elapsed = time.perf_counter() - started
+    click.echo(', '.join(f'{count} {table}' for table, count in counts.items()) + f' in {elapsed:.1f}s')
@@ -0,0 +1,131 @@
+"""
+Settings read from the environment once at import. Everything has a default that works for local
+development against `core/store.sqlite3`; set DATABASE_URL to point the app at PostgreSQL, e.g.
+postgresql://postgres:password@db:5432/fyle_db for the docker-compose service.
+"""
+import os
+import tempfile
+from sqlalchemy.engine import make_url
+
+from core.libs import cooperative
+from core.libs.metrics import TimedQueuePool
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///./store.sqlite3')
+SQLALCHEMY_ECHO = env_bool('SQLALCHEMY_ECHO', False)
+SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# read-only requests are routed to DATABASE_READ_URL (a replica) if set, else to a read-only pool on the
+# SQLite file; DB_READ_ROUTING=false keeps them on the primary
+DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+DB_READ_ROUTING = env_bool('DB_READ_ROUTING', True)
+# how long a principal's reads stay on the primary after they write, to hide replica lag
+DB_READ_YOUR_WRITES_SECONDS = env_int('DB_READ_YOUR_WRITES_SECONDS', 5)
+
+# connection pool, applied to every backend (SQLite included, which otherwise opens a connection per checkout)
+DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 10)
+DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+# server side limit on a single statement, 0 disables it; only PostgreSQL enforces one
+DB_STATEMENT_TIMEOUT_MS = env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+
+# coalesce concurrent writes of a worker into shared transactions, see core/libs/transactions.py
+GROUP_COMMIT_ENABLED = env_bool('GROUP_COMMIT_ENABLED', False)
+GROUP_COMMIT_WINDOW_MS = env_int('GROUP_COMMIT_WINDOW_MS', 2)
+GROUP_COMMIT_MAX_BATCH = env_int('GROUP_COMMIT_MAX_BATCH', 64)
+
+# listing results cached per worker, see core/libs/cache.py; other workers' writes show after the TTL, so only
+# enable it with a single worker or when reads may lag writes by that long
+QUERY_CACHE_ENABLED = env_bool('QUERY_CACHE_ENABLED', False)
+QUERY_CACHE_MAX_ENTRIES = env_int('QUERY_CACHE_MAX_ENTRIES', 1024)
+QUERY_CACHE_TTL_SECONDS = env_int('QUERY_CACHE_TTL_SECONDS', 5)
+
+# statements counted and timed per request, see core/libs/querystats.py
+SQL_INSTRUMENTATION_ENABLED = env_bool('SQL_INSTRUMENTATION_ENABLED', True)
+SQL_SLOW_QUERY_MS = env_int('SQL_SLOW_QUERY_MS', 100)
+SQL_REPEATED_STATEMENT_LIMIT = env_int('SQL_REPEATED_STATEMENT_LIMIT', 10)
+
+# JSON lines of each request's phases, see core/libs/tracing.py; a file path, '-' for the log, or unset
+TRACE_SINK = os.environ.get('TRACE_SINK') or None
+TRACE_MIN_MS = env_int('TRACE_MIN_MS', 0)
+
+# requests sending this token in X-Profile are profiled, see core/libs/profiling.py; unset disables profiling
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'fyle-profiles')
+
+# stacks of every worker thread sampled continuously, see core/libs/profiling.py
+SAMPLING_PROFILER_ENABLED = env_bool('SAMPLING_PROFILER_ENABLED', False)
+SAMPLING_PROFILER_DIR = os.environ.get('SAMPLING_PROFILER_DIR') or os.path.join(tempfile.gettempdir(), 'fyle-samples')
+SAMPLING_PROFILER_HZ = env_int('SAMPLING_PROFILER_HZ', 50)
+SAMPLING_PROFILER_FLUSH_SECONDS = env_int('SAMPLING_PROFILER_FLUSH_SECONDS', 60)
+SAMPLING_PROFILER_MAX_STACKS = env_int('SAMPLING_PROFILER_MAX_STACKS', 10000)
+
+# tracemalloc snapshots and per-route memory balances, see core/libs/memory.py
+MEMORY_DIAGNOSTICS_ENABLED = env_bool('MEMORY_DIAGNOSTICS_ENABLED', False)
+MEMORY_SNAPSHOT_EVERY_REQUESTS = env_int('MEMORY_SNAPSHOT_EVERY_REQUESTS', 1000)
+MEMORY_TOP_SITES = env_int('MEMORY_TOP_SITES', 10)
+MEMORY_TRACE_FRAMES = env_int('MEMORY_TRACE_FRAMES', 1)
+# restart a worker whose RSS grew by more than this since its first snapshot, 0 never does
+MEMORY_RECYCLE_GROWTH_MB = env_int('MEMORY_RECYCLE_GROWTH_MB', 0)
+
+# X-Principal tokens, see core/libs/tokens.py; raw JSON principals are only trusted while no secret is set
+PRINCIPAL_TOKEN_SECRET = os.environ.get('PRINCIPAL_TOKEN_SECRET') or None
+PRINCIPAL_ALLOW_UNSIGNED = env_bool('PRINCIPAL_ALLOW_UNSIGNED', PRINCIPAL_TOKEN_SECRET is None)
+PRINCIPAL_TOKEN_CACHE_SIZE = env_int('PRINCIPAL_TOKEN_CACHE_SIZE', 4096)
+# check X-Principal ids against an in-memory index of the users and their roles, see core/libs/directory.py
+PRINCIPAL_DIRECTORY_ENABLED = env_bool('PRINCIPAL_DIRECTORY_ENABLED', False)
+PRINCIPAL_DIRECTORY_REFRESH_SECONDS = env_int('PRINCIPAL_DIRECTORY_REFRESH_SECONDS', 5)
+PRINCIPAL_DIRECTORY_RELOAD_SECONDS = env_int('PRINCIPAL_DIRECTORY_RELOAD_SECONDS', 300)
+
+# native threads per gevent worker that run SQLite statements, see core/libs/cooperative.py
+GEVENT_DB_THREADS = env_int('GEVENT_DB_THREADS', 8)
+
+# with a directory, every gunicorn worker writes its metrics there and /metrics reports the sum of all of them;
+# gunicorn_config.py picks a temporary one when it is unset
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = env_int('METRICS_FLUSH_SECONDS', 1)
+
+# applied by core._set_sqlite_pragma on every new SQLite connection
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+SQLITE_MMAP_SIZE = env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+# negative values are KiB rather than pages
+SQLITE_CACHE_SIZE = env_int('SQLITE_CACHE_SIZE', -64 * 1024)
+
+
+def engine_options(uri, pool_size=None, max_overflow=None):
+    """Keyword arguments for create_engine, as passed through SQLALCHEMY_ENGINE_OPTIONS"""
+    url = make_url(uri)
+    options = {
+        'pool_size': DB_POOL_SIZE if pool_size is None else pool_size,
+        'max_overflow': DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+        # reports checkout waits to the db_pool_checkout_wait_seconds metric
+        'poolclass': TimedQueuePool,
+    }
+
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}
+        # pooled connections are handed between threads; sqlite3 only allows that when asked to
+        options['connect_args'] = {'check_same_thread': False, 'factory': cooperative.sqlite_factory()}
+    elif url.get_backend_name() == 'postgresql' and DB_STATEMENT_TIMEOUT_MS:
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+
+    return options
+
+
+SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
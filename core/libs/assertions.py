@@ -20,6 +20,11 @@ def assert_valid(cond, msg='BAD_REQUEST'):
         base_assert(400, msg)
 
 
+def assert_not_stale(cond, msg='CONFLICT'):
+    if cond is False:
+        base_assert(409, msg)
+
+
 def assert_found(_obj, msg='NOT_FOUND'):
     if _obj is None:
         base_assert(404, msg)
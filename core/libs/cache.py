@@ -0,0 +1,169 @@
+"""
+Process local cache of listing query results, with LRU and TTL eviction.
+
+Entries are scoped to a table, optionally narrowed to one value of an owner column the model lists in its
+`cache_owner_columns` (e.g. all assignments of student_id 5), and are invalidated when a commit touches rows
+of that scope. Invalidation bumps generation counters instead of deleting entries: an entry remembers the
+generations of its scope from before it was loaded, so a result read concurrently with a commit can never
+outlive it.
+
+Writes made by other processes, or outside of an ORM session, are only picked up once the TTL expires. With
+more than one gunicorn worker a principal's own write can therefore be missing from their next read, when
+another worker serves it, so the cache is off unless QUERY_CACHE_ENABLED is set.
+
+Hits, misses and evictions are counted by `stats()` and, given a metrics registry, by counters per table,
+which /metrics exports.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+
+PENDING_KEY = 'query_cache_pending'
+# execution option of UPDATE / DELETE statements whose caller reports the rows it changed via note_changed
+CALLER_NOTES_CHANGES = 'query_cache_caller_notes'
+
+
+class QueryCache:
+    def __init__(self, max_entries=1024, ttl_seconds=5, enabled=True, registry=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._counters = None
+        if registry is not None:
+            self._counters = {
+                kind: registry.counter(f'query_cache_{kind}_total', f'Listing cache {kind}, by table', ('table',))
+                for kind in ('hits', 'misses', 'evictions')
+            }
+
+    def get_or_load(self, session, table, scope, variant, load):
+        """
+        Returns the cached result of `load()` for `scope`, None for the whole table or a (column, value)
+        pair, and `variant` (e.g. the page). ORM instances are cached detached and every caller gets its own
+        copies, merged into its session without a query: changing one never reaches other requests, and
+        attributes that were not loaded load from the caller's session.
+        """
+        if not self.enabled or session.new or session.dirty or session.deleted or session.info.get(PENDING_KEY):
+            # this transaction may hold uncommitted changes, which must neither be served nor cached
+            return load()
+
+        key = (table, scope, variant)
+        tags = _tags(table, scope)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic() and entry[1] == self._snapshot(tags):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._count('hits', table)
+                return _copies(session, entry[2])
+
+            self.misses += 1
+            self._count('misses', table)
+            snapshot = self._snapshot(tags)
+
+        rows = load()
+        for row in rows:
+            if hasattr(row, '_sa_instance_state'):
+                session.expunge(row)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, snapshot, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                (evicted_table, _, _), _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._count('evictions', evicted_table)
+
+        return _copies(session, rows)
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def note_changed(self, session, obj, changed=()):
+        """
+        Records that `obj` was changed in the current transaction of `session`. Owner columns in `changed`
+        invalidate every scope of that column, since their previous value is no longer known.
+        """
+        table = obj.__table__.name
+        tags = {(table, 'rows')}
+        for column in type(obj).cache_owner_columns:
+            if column in changed:
+                tags.add((table, column))
+            else:
+                tags.add((table, column, getattr(obj, column)))
+        _pending(session).update(tags)
+
+    def listen(self, session_class):
+        """Invalidates the scopes changed by each commit of `session_class` sessions"""
+        event.listen(session_class, 'after_flush', self._after_flush)
+        event.listen(session_class, 'do_orm_execute', self._do_orm_execute)
+        event.listen(session_class, 'after_commit', self._after_commit)
+        event.listen(session_class, 'after_soft_rollback', self._after_soft_rollback)
+
+    def _after_flush(self, session, flush_context):
+        tags = _pending(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, '__table__', None)
+            if table is None:
+                continue
+            tags.add((table.name, 'rows'))
+            state = inspect(obj)
+            for column in getattr(type(obj), 'cache_owner_columns', ()):
+                # both the old and the new owner's listings change when a row moves between them
+                for value in state.attrs[column].history.sum():
+                    tags.add((table.name, column, value))
+
+    def _do_orm_execute(self, orm_execute_state):
+        if (orm_execute_state.is_update or orm_execute_state.is_delete) and \
+                not orm_execute_state.execution_options.get(CALLER_NOTES_CHANGES):
+            _pending(orm_execute_state.session).add((orm_execute_state.statement.table.name,))
+
+    def _after_commit(self, session):
+        tags = session.info.pop(PENDING_KEY, None)
+        if tags:
+            self.invalidate(tags)
+
+    def _after_soft_rollback(self, session, previous_transaction):
+        # a rolled back savepoint may share the transaction with units that do commit, so only the
+        # outermost rollback discards what was noted
+        if previous_transaction.parent is None:
+            session.info.pop(PENDING_KEY, None)
+
+    def _count(self, kind, table):
+        if self._counters is not None:
+            self._counters[kind].inc(table)
+
+    def _snapshot(self, tags):
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+
+def _tags(table, scope):
+    if scope is None:
+        return (table,), (table, 'rows')
+    column, value = scope
+    return (table,), (table, column), (table, column, value)
+
+
+def _copies(session, rows):
+    return [session.merge(row, load=False) if hasattr(row, '_sa_instance_state') else row for row in rows]
+
+
+def _pending(session):
+    return session.info.setdefault(PENDING_KEY, set())
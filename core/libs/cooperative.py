@@ -0,0 +1,131 @@
+"""
+Database access that cooperates with gevent workers.
+
+gunicorn's gevent worker monkey-patches the standard library, so sockets, locks and sleeps yield to the hub,
+but C extensions still block it: a pysqlite statement holds every greenlet of the worker until it returns.
+Once the process is patched, SQLite connections run their statements, commits and fetches on a bounded pool
+of native threads, where pysqlite releases the GIL, so only the calling greenlet waits. psycopg2 is switched
+to its asynchronous protocol with a wait callback that yields to the hub instead.
+
+Sessions need nothing extra: Flask-SQLAlchemy scopes them by greenlet.getcurrent, one per greenlet.
+Without gevent, or before it has patched the process, everything here is a no-op.
+"""
+import importlib
+import os
+import sqlite3
+
+try:
+    from gevent import monkey
+except ImportError:  # pragma: no cover
+    monkey = None
+
+# native threads per worker that run SQLite calls, set by install()
+db_threads = 8
+
+_pool = None
+_pool_pid = None
+_green_classes = {}
+
+
+def is_patched():
+    """Whether gevent has monkey-patched this process"""
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def original(module, name):
+    """`module.name` as it was before gevent patched it, e.g. to run a native thread in a patched process"""
+    if monkey is None:  # pragma: no cover
+        return getattr(importlib.import_module(module), name)
+    return monkey.get_original(module, name)
+
+
+def install(threads=None):
+    """Sizes the SQLite thread pool and makes psycopg2 yield to the hub, if gevent has patched the process"""
+    global db_threads
+    if threads is not None:
+        db_threads = threads
+    if not is_patched():
+        return
+
+    try:
+        from psycopg2 import extensions
+    except ImportError:  # pragma: no cover
+        return
+    extensions.set_wait_callback(_wait_psycopg2)
+
+
+def sqlite_factory(base=sqlite3.Connection):
+    """The class to open SQLite connections with: `base`, made cooperative once gevent has patched the process"""
+    if not is_patched():
+        return base
+    factory = _green_classes.get(base)
+    if factory is None:
+        factory = _green_classes[base] = type(f'Green{base.__name__}', (GreenSQLite3Connection, base), {})
+    return factory
+
+
+def offload(func, *args):
+    """Runs `func(*args)` on the native thread pool, blocking only the calling greenlet"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        # the hub and its threads do not survive a fork
+        from gevent.threadpool import ThreadPool
+        _pool, _pool_pid = ThreadPool(db_threads), os.getpid()
+    return _pool.apply(func, args)
+
+
+class GreenSQLite3Cursor(sqlite3.Cursor):
+    def execute(self, *args):
+        return offload(super().execute, *args)
+
+    def executemany(self, *args):
+        return offload(super().executemany, *args)
+
+    def executescript(self, *args):
+        return offload(super().executescript, *args)
+
+    def fetchone(self):
+        # each row steps the statement, which can scan a table before it finds one
+        return offload(super().fetchone)
+
+    def __next__(self):
+        # fetchone rather than __next__, whose StopIteration the pool would report as a failed task
+        row = offload(super().fetchone)
+        if row is None:
+            raise StopIteration
+        return row
+
+    def fetchmany(self, *args):
+        return offload(super().fetchmany, *args)
+
+    def fetchall(self):
+        return offload(super().fetchall)
+
+
+class GreenSQLite3Connection(sqlite3.Connection):
+    """sqlite3 connection whose statements run on the native thread pool; needs check_same_thread=False"""
+
+    def cursor(self, factory=GreenSQLite3Cursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        return offload(super().commit)
+
+    def rollback(self):
+        return offload(super().rollback)
+
+
+def _wait_psycopg2(connection, timeout=None):
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'bad result from poll: {state}')
@@ -0,0 +1,127 @@
+"""
+Process local index of which user each student, teacher and principal id belongs to.
+
+The index is loaded once per worker and then refreshed incrementally from the rows' `updated_at`, so checking
+an X-Principal against it is a couple of dict lookups instead of a query per request. Rows are re-read from a
+little before the newest `updated_at` seen, since a transaction can commit a row stamped earlier than rows
+committed before it. Deleted rows are only dropped by the periodic full reload.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import select
+
+# rows stamped this long before the newest one seen are read again on every refresh
+REFRESH_OVERLAP = timedelta(seconds=30)
+# a principal that is not found refreshes the index at most this often, so new users are let in quickly
+# without forged ids turning every request into queries
+MISS_REFRESH_SECONDS = 1
+
+
+class PrincipalDirectory:
+    def __init__(self, get_bind, users, roles, refresh_seconds=5, reload_seconds=300, enabled=True):
+        """
+        `users` is the users model and `roles` maps each principal claim (e.g. 'student_id') to the model
+        whose ids it holds, every one with a `user_id` column; `get_bind` returns the engine to read them from.
+        """
+        self.get_bind = get_bind
+        self.users = users
+        self.roles = roles
+        self.refresh_seconds = refresh_seconds
+        self.reload_seconds = reload_seconds
+        self.enabled = enabled
+        self.refreshes = 0
+        self.reloads = 0
+        self._user_ids = set()
+        self._owners = {claim: {} for claim in roles}
+        self._watermarks = {}
+        self._refreshed_at = self._reloaded_at = None
+        self._lock = threading.Lock()
+
+    def knows(self, user_id, **claims):
+        """Whether `user_id` exists and owns every non-None id in `claims`, e.g. student_id=1"""
+        now = time.monotonic()
+        if self._reloaded_at is None:
+            self._load_once()
+        elif now - self._reloaded_at >= self.reload_seconds:
+            # one thread reloads, the others keep answering from the current index meanwhile
+            self.load(blocking=False)
+        elif now - self._refreshed_at >= self.refresh_seconds:
+            self.refresh()
+
+        if self._matches(user_id, claims):
+            return True
+        if time.monotonic() - self._refreshed_at >= MISS_REFRESH_SECONDS and self.refresh():
+            return self._matches(user_id, claims)
+        return False
+
+    def load(self, blocking=True):
+        """Reads every user and role again, dropping deleted ones; False if not blocking and another thread is"""
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._load()
+            return True
+        finally:
+            self._lock.release()
+
+    def _load_once(self):
+        with self._lock:
+            # the threads that waited for the first load find the index it read
+            if self._reloaded_at is None:
+                self._load()
+
+    def _load(self):
+        user_ids, owners, watermarks = set(), {claim: {} for claim in self.roles}, {}
+        with self.get_bind().connect() as connection:
+            self._read(connection, user_ids, owners, watermarks, since=None)
+        self._user_ids, self._owners, self._watermarks = user_ids, owners, watermarks
+        self._refreshed_at = self._reloaded_at = time.monotonic()
+        self.reloads += 1
+
+    def refresh(self):
+        """Reads the rows updated since the last load or refresh; False if another thread already is"""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            with self.get_bind().connect() as connection:
+                self._read(connection, self._user_ids, self._owners, self._watermarks, since=self._watermarks)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            return True
+        finally:
+            self._lock.release()
+
+    def _matches(self, user_id, claims):
+        if user_id not in self._user_ids:
+            return False
+        for claim, value in claims.items():
+            if value is not None and self._owners[claim].get(value) != user_id:
+                return False
+        return True
+
+    def _read(self, connection, user_ids, owners, watermarks, since):
+        users = self.users.__table__
+        for row in connection.execute(self._changed(select(users.c.id, users.c.updated_at), users, since)):
+            user_ids.add(row.id)
+            _advance(watermarks, users.name, row.updated_at)
+
+        for claim, model in self.roles.items():
+            table = model.__table__
+            query = self._changed(select(table.c.id, table.c.user_id, table.c.updated_at), table, since)
+            for row in connection.execute(query):
+                owners[claim][row.id] = row.user_id
+                _advance(watermarks, table.name, row.updated_at)
+
+    @staticmethod
+    def _changed(query, table, since):
+        watermark = since and since.get(table.name)
+        if watermark is None:
+            return query
+        return query.where(table.c.updated_at >= watermark - REFRESH_OVERLAP)
+
+
+def _advance(watermarks, name, updated_at):
+    if updated_at is not None and (name not in watermarks or updated_at > watermarks[name]):
+        watermarks[name] = updated_at
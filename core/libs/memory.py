@@ -0,0 +1,131 @@
+"""
+Memory diagnostics for finding leaks in workers, off unless enabled since tracemalloc slows every allocation.
+
+Once enabled, tracemalloc traces the worker's Python allocations. Each request is charged with the change in
+traced memory between its first before_request hook and its teardown, summed per route, so a route that
+keeps memory shows a steadily positive balance. With concurrent requests (gthread or gevent workers) the
+balance also holds the others' allocations, so it is only meaningful over many requests.
+
+Every `snapshot_every` requests a snapshot is compared with the previous one and logged as JSON by the
+`core.libs.memory` logger: RSS, traced memory and its growth since the first snapshot, the `top`
+allocation sites that grew most and the per-route balances of the interval. The RSS and traced memory of
+each report are also exported per worker as gauges of the metrics registry.
+
+With `recycle_growth_mb`, a worker whose RSS grew by more than that since its first snapshot calls
+`recycle()`, which gunicorn_config.py points at a graceful restart of the worker.
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import tracemalloc
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def rss_bytes():
+    """The resident set size of this process, or its peak where the current one is not available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+class MemoryMonitor:
+    def __init__(self, registry, snapshot_every=1000, top=10, recycle_growth_mb=0, frames=1, enabled=True):
+        self.snapshot_every = snapshot_every
+        self.top = top
+        self.recycle_growth = recycle_growth_mb * 1024 * 1024
+        self.frames = frames
+        self.enabled = enabled
+        self.recycle = None
+        self.requests = 0
+        self.routes = {}
+        self.baseline = None
+        self._snapshot = None
+        # teardowns run concurrently under gthread and gevent workers
+        self._lock = threading.Lock()
+        self._report_lock = threading.Lock()
+        if enabled:
+            self.rss = registry.gauge('process_resident_memory_bytes', 'Resident memory per worker', ('pid',))
+            self.traced = registry.gauge('python_traced_memory_bytes', 'Memory traced by tracemalloc per worker',
+                                         ('pid',))
+
+    def init_app(self, app):
+        if not self.enabled:
+            return
+
+        @app.before_request
+        def _note_memory():
+            if not tracemalloc.is_tracing():
+                # started by the first request, so a forking server traces each worker and not its master
+                tracemalloc.start(self.frames)
+            g.traced_memory = tracemalloc.get_traced_memory()[0]
+
+        @app.teardown_request
+        def _charge_memory(exc):
+            before = g.pop('traced_memory', None)
+            if before is not None:
+                rule = request.url_rule
+                self.charge('<unmatched>' if rule is None else rule.rule, tracemalloc.get_traced_memory()[0] - before)
+
+    def charge(self, route, retained):
+        """Counts a request of `route` which left `retained` more bytes traced, snapshotting every N requests"""
+        with self._lock:
+            requests, total = self.routes.get(route, (0, 0))
+            self.routes[route] = (requests + 1, total + retained)
+            self.requests += 1
+            if self.requests % self.snapshot_every:
+                return
+            routes, self.routes = self.routes, {}
+            requests = self.requests
+        # outside of the counting lock, so other requests' teardowns do not wait on the snapshot
+        self.report(routes, requests)
+
+    def report(self, routes, requests):
+        """Logs the growth since the previous report, and recycles the worker if it grew past the limit"""
+        with self._report_lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            rss, traced = rss_bytes(), tracemalloc.get_traced_memory()[0]
+            if self.baseline is None:
+                self.baseline = (rss, traced)
+            pid = str(os.getpid())
+            self.rss.set(rss, pid)
+            self.traced.set(traced, pid)
+            previous, self._snapshot = self._snapshot, snapshot
+
+        report = {
+            'event': 'memory_snapshot',
+            'pid': os.getpid(),
+            'requests': requests,
+            'rss_bytes': rss,
+            'rss_growth_bytes': rss - self.baseline[0],
+            'traced_bytes': traced,
+            'traced_growth_bytes': traced - self.baseline[1],
+            'top_growth': [] if previous is None else [
+                {'site': str(stat.traceback), 'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                for stat in snapshot.compare_to(previous, 'lineno')[:self.top]
+            ],
+            'routes': {route: {'requests': count, 'retained_bytes': retained}
+                       for route, (count, retained) in sorted(routes.items(), key=lambda item: -item[1][1])},
+        }
+
+        recycle = bool(self.recycle_growth) and report['rss_growth_bytes'] > self.recycle_growth
+        report['recycle'] = recycle
+        logger.warning(json.dumps(report))
+        if recycle and self.recycle is not None:
+            self.recycle()
+        return report
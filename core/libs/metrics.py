@@ -0,0 +1,259 @@
+"""
+Counters, gauges and histograms rendered in the Prometheus text exposition format.
+
+Recording only updates dicts in memory. With a `directory`, each process also writes a snapshot of its
+values to `<directory>/<pid>.json` at most every `flush_seconds` from a background thread, and a scrape
+served by any worker sums the snapshots of all of them. Counters and histograms of processes that exited are
+folded into `archive.json`, so totals survive worker restarts; their gauges are dropped. These files should
+be removed when the server starts, as gunicorn_config.py does.
+"""
+import fcntl
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy.pool import QueuePool
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ARCHIVE = 'archive.json'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.series = {}
+
+    def _merge(self, series, other):
+        for labels, value in other:
+            labels = tuple(labels)
+            series[labels] = series.get(labels, 0) + value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.registry.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+            self.registry.dirty = True
+
+    def _samples(self, series):
+        for labels, value in series.items():
+            yield self.name, dict(zip(self.labels, labels)), value
+
+
+class Gauge(Counter):
+    """A value per process, summed over the live processes"""
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self.registry.lock:
+            self.series[labels] = value
+            self.registry.dirty = True
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        with self.registry.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # a count per bucket and one for +Inf, then the sum and the count of all values
+                series = self.series[labels] = [0] * (len(self.buckets) + 3)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+            self.registry.dirty = True
+
+    def _merge(self, series, other):
+        for labels, values in other:
+            labels = tuple(labels)
+            current = series.get(labels)
+            series[labels] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+
+    def _samples(self, series):
+        bounds = [_format_value(bound) for bound in self.buckets] + ['+Inf']
+        for labels, values in series.items():
+            labels = dict(zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip(bounds, values):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': bound}, cumulative
+            yield f'{self.name}_sum', labels, values[-2]
+            yield f'{self.name}_count', labels, values[-1]
+
+
+class Registry:
+    def __init__(self, directory=None, flush_seconds=1):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self._flusher_pid = None
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(self, name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(self, name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, labels, buckets))
+
+    def render(self):
+        """All metrics in the text exposition format, summed over every process sharing the directory"""
+        if self.directory is None:
+            with self.lock:
+                collected = {name: dict(metric.series) for name, metric in self.metrics.items()}
+        else:
+            self.flush()
+            collected = self._collect()
+
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for sample, labels, value in metric._samples(collected.get(name, {})):
+                lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Writes this process' values to its file in the directory"""
+        with self.lock:
+            snapshot = {name: [[list(labels), value] for labels, value in metric.series.items()]
+                        for name, metric in self.metrics.items()}
+            self.dirty = False
+        _write_json(os.path.join(self.directory, f'{os.getpid()}.json'), snapshot)
+
+    def start_flushing(self):
+        """Starts the thread flushing this process' values, once per process, from gunicorn's post_fork"""
+        with self.lock:
+            if self.directory is None or self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._flush_periodically, name='metrics-flusher', daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            if self.dirty:
+                self.flush()
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _collect(self):
+        collected = {name: {} for name in self.metrics}
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            # one scrape at a time, so an exited process is archived exactly once
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            archive_path = os.path.join(self.directory, ARCHIVE)
+            archive = _read_json(archive_path) or {}
+            archived = False
+
+            for filename in os.listdir(self.directory):
+                if not filename.endswith('.json') or filename == ARCHIVE:
+                    continue
+                path = os.path.join(self.directory, filename)
+                snapshot = _read_json(path)
+                if snapshot is None:
+                    continue
+                if _is_alive(int(filename[:-len('.json')])):
+                    self._merge(collected, snapshot, gauges=True)
+                    continue
+                merged = {name: {} for name in self.metrics}
+                self._merge(merged, archive, gauges=False)
+                self._merge(merged, snapshot, gauges=False)
+                archive = {name: [[list(labels), value] for labels, value in series.items()]
+                           for name, series in merged.items()}
+                os.remove(path)
+                archived = True
+
+            if archived:
+                _write_json(archive_path, archive)
+            self._merge(collected, archive, gauges=False)
+        return collected
+
+    def _merge(self, collected, snapshot, gauges):
+        for name, series in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is not None and (gauges or metric.kind != 'gauge'):
+                metric._merge(collected[name], series)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file, separators=(',', ':'))
+    os.replace(temporary, path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool reporting how long each checkout waited to `on_checkout_wait(seconds)`"""
+    on_checkout_wait = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if TimedQueuePool.on_checkout_wait is not None:
+                TimedQueuePool.on_checkout_wait(time.perf_counter() - started)
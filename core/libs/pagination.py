@@ -0,0 +1,98 @@
+import base64
+import json
+from sqlalchemy import tuple_
+from . import assertions
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+
+    # sort keys are integer ids, and anything else would reach the database as a bind parameter
+    assertions.assert_valid(
+        isinstance(values, list) and len(values) > 0
+        and all(isinstance(value, int) and not isinstance(value, bool) for value in values),
+        'cursor is invalid'
+    )
+    return tuple(values)
+
+
+class PageRequest:
+    """A keyset page: at most `limit` rows whose sort key is strictly after `after`"""
+    stream = False
+
+    def __init__(self, limit=DEFAULT_PAGE_LIMIT, after=None):
+        self.limit = limit
+        self.after = after
+
+    @classmethod
+    def from_request(cls, request):
+        """Builds a page from the query string, or a stream if the client accepts NDJSON"""
+        args = request.args
+        cursor = args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+
+        if request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return StreamRequest(after=after)
+
+        limit = args.get('limit', DEFAULT_PAGE_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = None
+        assertions.assert_valid(limit is not None and 0 < limit <= MAX_PAGE_LIMIT,
+                                f'limit should be an integer between 1 and {MAX_PAGE_LIMIT}')
+
+        return cls(limit=limit, after=after)
+
+    @property
+    def cache_key(self):
+        return self.limit, self.after
+
+    def seek(self, query, *key_columns):
+        if self.after is not None:
+            assertions.assert_valid(len(self.after) == len(key_columns), 'cursor is invalid')
+            if len(key_columns) == 1:
+                query = query.filter(key_columns[0] > self.after[0])
+            else:
+                query = query.filter(tuple_(*key_columns) > tuple_(*self.after))
+
+        return query.order_by(*key_columns)
+
+    def apply(self, query, *key_columns):
+        """Seeks `query` past the cursor and fetches one extra row to detect a next page"""
+        return self.seek(query, *key_columns).limit(self.limit + 1).all()
+
+    def split(self, rows, key_attrs=('id',)):
+        """Returns the rows of this page and the cursor of the next one, if any"""
+        if len(rows) <= self.limit:
+            return rows, None
+
+        rows = rows[:self.limit]
+        last = rows[-1]
+        return rows, encode_cursor(getattr(last, attr) for attr in key_attrs)
+
+
+class StreamRequest(PageRequest):
+    """Every row after `after`, read lazily in batches of `batch_size`"""
+    stream = True
+
+    def __init__(self, after=None, batch_size=STREAM_BATCH_SIZE):
+        super().__init__(limit=None, after=after)
+        self.batch_size = batch_size
+
+    def apply(self, query, *key_columns):
+        return self.seek(query, *key_columns).yield_per(self.batch_size)
@@ -0,0 +1,231 @@
+"""
+Profiles of single requests on demand, and continuous sampling of every thread of a worker.
+
+A request sending `X-Profile: <token>` with the configured token runs under a profiler from its first
+before_request hook until its teardown, NDJSON streams included. The token is only read from the header: a
+query string would write it to the access log. The profile is written to
+`<directory>/<request id>.<pid>.<format>` and its file name sent back in `X-Profile-File`. Formats, chosen
+with `X-Profile-Format` or `?profile_format=`:
+
+- pstats (default): cProfile's, for `python -m pstats` or snakeviz
+- collapsed: one `frame;frame;... microseconds` line per stack, for flamegraph.pl or speedscope
+
+Without a token no hook is installed, so requests pay nothing. Requests with a wrong token run unprofiled.
+
+Profilers follow the thread they were started on. Under gevent workers, where one thread runs every
+greenlet, they are also paused whenever the profiled greenlet switches out, so other requests' work is not
+charged to it. Statements offloaded to the SQLite thread pool show as time waiting on it.
+
+SamplingProfiler instead runs in every worker, started by gunicorn_config.py, on a native thread that takes
+the stack of every other thread `hz` times a second. Samples are counted per collapsed stack, at most
+`max_stacks` different ones between flushes (later new stacks count as `[other]`), and written to
+`<directory>/<pid>.<unix time>.collapsed` every `flush_seconds`, on SIGUSR2 and when the worker exits.
+Under gevent only the greenlet running at the time of a sample is seen, which is where the time goes.
+"""
+import cProfile
+import functools
+import hmac
+import os
+import signal
+import sys
+import time
+
+from flask import g, request
+
+from core.libs import cooperative
+
+FORMATS = ('pstats', 'collapsed')
+OTHER_STACKS = '[other]'
+
+
+@functools.lru_cache(maxsize=4096)
+def _label(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class StackProfiler:
+    """A deterministic profiler recording the wall time spent in each call stack"""
+
+    def __init__(self):
+        self.stacks = {}
+        self._stack = []
+        self._last = None
+
+    def enable(self):
+        self._last = time.perf_counter()
+        sys.setprofile(self._profile)
+
+    def disable(self):
+        sys.setprofile(None)
+
+    def dump_stats(self, path):
+        with open(path, 'w') as output:
+            for stack, seconds in sorted(self.stacks.items()):
+                microseconds = round(seconds * 1e6)
+                if microseconds:
+                    output.write(f'{stack} {microseconds}\n')
+
+    def _profile(self, frame, event, arg):
+        now = time.perf_counter()
+        stack = self._stack
+        if stack:
+            key = stack[-1][1]
+            self.stacks[key] = self.stacks.get(key, 0) + now - self._last
+
+        if event == 'call':
+            label = _label(frame.f_code)
+            stack.append((frame, f'{stack[-1][1]};{label}' if stack else label))
+        elif event == 'c_call':
+            label = getattr(arg, '__qualname__', None) or getattr(arg, '__name__', repr(arg))
+            stack.append((arg, f'{stack[-1][1]};{label}' if stack else label))
+        elif stack and stack[-1][0] is (frame if event == 'return' else arg):
+            # returns of frames entered before the profiler was enabled have nothing to pop
+            stack.pop()
+        self._last = time.perf_counter()
+
+
+class RequestProfiler:
+    def __init__(self, token=None, directory=None):
+        self.token = token
+        self.directory = directory
+        # profiler of each greenlet being profiled, paused while it is switched out
+        self._greenlets = {}
+        self._previous_trace = None
+        self._tracing = False
+
+    def init_app(self, app):
+        if not self.token:
+            return
+
+        @app.before_request
+        def _start_profile():
+            token = request.headers.get('X-Profile')
+            if token is None or not hmac.compare_digest(token.encode(), self.token.encode()):
+                return
+            output = request.headers.get('X-Profile-Format') or request.args.get('profile_format') or FORMATS[0]
+            if output not in FORMATS:
+                output = FORMATS[0]
+            os.makedirs(self.directory, exist_ok=True)
+            request_id = g.get('request_id') or os.urandom(8).hex()
+            g.profile_path = os.path.join(self.directory, f'{request_id}.{os.getpid()}.{output}')
+            g.profiler = cProfile.Profile() if output == 'pstats' else StackProfiler()
+            self._start(g.profiler)
+
+        @app.after_request
+        def _send_profile_path(response):
+            path = g.get('profile_path')
+            if path is not None:
+                response.headers['X-Profile-File'] = os.path.basename(path)
+            return response
+
+        @app.teardown_request
+        def _end_profile(exc):
+            profiler = g.pop('profiler', None)
+            if profiler is not None:
+                self._stop(profiler)
+                profiler.dump_stats(g.pop('profile_path'))
+
+    def _start(self, profiler):
+        if cooperative.is_patched():
+            import greenlet
+            self._greenlets[greenlet.getcurrent()] = profiler
+            if not self._tracing:
+                self._previous_trace = greenlet.settrace(self._switched)
+                self._tracing = True
+        profiler.enable()
+
+    def _stop(self, profiler):
+        profiler.disable()
+        if cooperative.is_patched():
+            import greenlet
+            self._greenlets.pop(greenlet.getcurrent(), None)
+
+    def _switched(self, event, args):
+        if event in ('switch', 'throw'):
+            origin, target = args
+            leaving = self._greenlets.get(origin)
+            if leaving is not None:
+                leaving.disable()
+            entering = self._greenlets.get(target)
+            if entering is not None:
+                entering.enable()
+        if self._previous_trace is not None:
+            self._previous_trace(event, args)
+
+
+class SamplingProfiler:
+    def __init__(self, directory, hz=50, flush_seconds=60, max_stacks=10000, max_depth=128, enabled=True):
+        self.directory = directory
+        self.interval = 1 / hz
+        self.flush_seconds = flush_seconds
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.enabled = enabled
+        self.stacks = {}
+        # shared by the native sampling thread and the worker's, so never one of gevent's locks
+        self._lock = cooperative.original('_thread', 'allocate_lock')()
+        self._flush_requested = False
+        self._thread_id = None
+        self._pid = None
+
+    def start(self):
+        """Starts sampling this process, once per process"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.stacks = {}
+        os.makedirs(self.directory, exist_ok=True)
+        # a native thread, even under gevent: a greenlet would only sample while the others wait
+        cooperative.original('_thread', 'start_new_thread')(self._run, ())
+
+    def stop(self):
+        """Stops the sampling thread after its current sample"""
+        self._pid = None
+
+    def flush_on_signal(self, signum=signal.SIGUSR2):
+        """Flushes on `signum`; install once the worker has set up its own signal handlers"""
+        signal.signal(signum, self._request_flush)
+
+    def sample(self):
+        frames = sys._current_frames()
+        frames.pop(self._thread_id, None)
+        stacks = []
+        for frame in frames.values():
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(_label(frame.f_code))
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(labels)))
+
+        with self._lock:
+            for stack in stacks:
+                if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+                    stack = OTHER_STACKS
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def flush(self):
+        """Writes the stacks sampled since the last flush, returning the file or None if there were none"""
+        with self._lock:
+            stacks, self.stacks = self.stacks, {}
+            self._flush_requested = False
+        if not stacks:
+            return None
+        path = os.path.join(self.directory, f'{os.getpid()}.{int(time.time())}.collapsed')
+        with open(path, 'a') as output:
+            output.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+        return path
+
+    def _request_flush(self, signum, frame):
+        # the sampling thread writes the file, so a signal never waits on its lock
+        self._flush_requested = True
+
+    def _run(self):
+        self._thread_id = cooperative.original('_thread', 'get_ident')()
+        sleep = cooperative.original('time', 'sleep')
+        next_flush = time.monotonic() + self.flush_seconds
+        while self._pid == os.getpid():
+            sleep(self.interval)
+            self.sample()
+            if self._flush_requested or time.monotonic() >= next_flush:
+                self.flush()
+                next_flush = time.monotonic() + self.flush_seconds
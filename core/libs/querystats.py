@@ -0,0 +1,127 @@
+"""
+Per-request accounting of the SQL sent to the database, from the engines' cursor events.
+
+Every request gets its statement count, total database time and slowest statement, reported to the client
+as a `Server-Timing` header. Statements slower than `slow_ms` are logged as they finish, and a request that
+runs one statement shape more than `repeat_limit` times is logged once it responds, which is how an N+1
+query shows. Both log records are JSON, with the statement normalized: whitespace collapsed, bind
+placeholders as `?` and expanded IN lists as `(?, ...)`, so the records of one query group together.
+
+Only statements run in a request context are counted. The commits of GROUP_COMMIT_ENABLED run on the
+committer thread and the rows of NDJSON streams are read after the headers are sent, so neither shows.
+"""
+import functools
+import json
+import logging
+import re
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(statement):
+    """`statement` with its whitespace collapsed and its literals, placeholders and IN lists as `?`"""
+    statement = _PLACEHOLDER.sub('?', _WHITESPACE.sub(' ', statement).strip())
+    return _PLACEHOLDER_LIST.sub('(?, ...)', statement)
+
+
+def bind_shape(parameters, executemany):
+    """The type names of `parameters`, without their values, for the logs"""
+    if executemany:
+        rows = list(parameters or ())
+        return {'rows': len(rows), 'row': bind_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class RequestQueries:
+    __slots__ = ('count', 'seconds', 'slowest', 'slowest_statement', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes = {}
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] = self.shapes.get(statement, 0) + 1
+        if seconds >= self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self):
+        return (f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries", '
+                f'db-slowest;dur={self.slowest * 1000:.2f}')
+
+
+class QueryStats:
+    def __init__(self, slow_ms=100, repeat_limit=10, enabled=True):
+        self.slow_seconds = slow_ms / 1000
+        self.repeat_limit = repeat_limit
+        self.enabled = enabled
+
+    def listen(self, target):
+        """Counts the statements of `target`, an Engine or the Engine class for all of them"""
+        event.listen(target, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(target, 'after_cursor_execute', self._after_cursor_execute)
+
+    def init_app(self, app):
+        @app.after_request
+        def _report_queries(response):
+            queries = g.pop('queries', None)
+            if queries is None:
+                return response
+            response.headers.add('Server-Timing', queries.server_timing())
+            for statement, count in queries.shapes.items():
+                if count > self.repeat_limit:
+                    _log('repeated_statement', statement=statement, count=count,
+                         db_ms=round(queries.seconds * 1000, 3))
+            return response
+
+    def current(self):
+        """The RequestQueries of the current request, None outside of one or while disabled"""
+        if not self.enabled or not has_request_context():
+            return None
+        queries = g.get('queries')
+        if queries is None:
+            queries = g.queries = RequestQueries()
+        return queries
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and has_request_context():
+            context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        queries = self.current()
+        if started is None or queries is None:
+            return
+        seconds = time.perf_counter() - started
+        normalized = normalize(statement)
+        queries.record(normalized, seconds)
+        if seconds >= self.slow_seconds:
+            _log('slow_query', statement=normalized, binds=bind_shape(parameters, executemany),
+                 duration_ms=round(seconds * 1000, 3))
+
+
+def _log(kind, **fields):
+    rule = request.url_rule
+    logger.warning(json.dumps({
+        'event': kind,
+        'request_id': g.get('request_id'),
+        'method': request.method,
+        'route': '<unmatched>' if rule is None else rule.rule,
+        **fields,
+    }, default=str))
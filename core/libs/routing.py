@@ -0,0 +1,134 @@
+"""
+Read/write routing for the db session. Requests that cannot write (GET, HEAD) run their queries on a
+separate read engine, everything else - and anything flushed - goes to the primary. The read engine is
+DATABASE_READ_URL when set (a replica), otherwise a read-only connection pool on the same SQLite file,
+whose WAL readers never wait on the writer.
+
+Replicas lag, so for DB_READ_YOUR_WRITES_SECONDS after a principal's write their reads stay on the
+primary. That memory is per worker process; a replica deployment behind several workers should keep the
+window comfortably above the replication lag.
+"""
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import create_engine, orm
+from sqlalchemy.engine import make_url
+
+from . import cooperative
+from .metrics import TimedQueuePool
+
+READ_METHODS = frozenset(['GET', 'HEAD'])
+MAX_TRACKED_WRITERS = 10000
+
+
+class ReadOnlySQLite3Connection(sqlite3.Connection):
+    """Marks connections of the SQLite read pool, so connect hooks can skip settings they cannot change"""
+
+
+class RecentWriters:
+    """Bounded, per process record of when each principal last wrote"""
+
+    def __init__(self, window, capacity=MAX_TRACKED_WRITERS):
+        self.window = window
+        self.capacity = capacity
+        self._last_write = OrderedDict()
+        self._lock = Lock()
+
+    def note(self, user_id):
+        if not self.window or user_id is None:
+            return
+        with self._lock:
+            self._last_write[user_id] = time.monotonic()
+            self._last_write.move_to_end(user_id)
+            while len(self._last_write) > self.capacity:
+                self._last_write.popitem(last=False)
+
+    def wrote_recently(self, user_id):
+        if not self.window or user_id is None:
+            return False
+        last_write = self._last_write.get(user_id)
+        return last_write is not None and time.monotonic() - last_write < self.window
+
+
+class RoutingSession(SignallingSession):
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self._flushing and self.db.reads_from_replica():
+            read_engine = self.db.get_read_engine()
+            if read_engine is not None:
+                return read_engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def __init__(self, app=None, **kwargs):
+        self._read_engine = None
+        self._read_engine_for = None
+        self.recent_writers = RecentWriters(window=0)
+        super().__init__(app, **kwargs)
+
+    def init_app(self, app):
+        super().init_app(app)
+        app.config.setdefault('DATABASE_READ_URL', None)
+        app.config.setdefault('DB_READ_ROUTING', True)
+        app.config.setdefault('DB_READ_YOUR_WRITES_SECONDS', 0)
+
+        # the read-only SQLite pool reads the very file the primary writes, so only a replica can lag
+        if app.config['DATABASE_READ_URL']:
+            self.recent_writers.window = app.config['DB_READ_YOUR_WRITES_SECONDS']
+
+        @app.after_request
+        def _note_write(response):
+            principal = g.get('principal')
+            if request.method not in READ_METHODS and principal is not None and response.status_code < 400:
+                self.recent_writers.note(principal.user_id)
+            return response
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def reads_from_replica(self):
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        principal = g.get('principal')
+        return not (principal is not None and self.recent_writers.wrote_recently(principal.user_id))
+
+    def get_read_engine(self):
+        """The engine for read-only requests, or None when they should share the primary"""
+        app = self.get_app()
+        if not app.config['DB_READ_ROUTING']:
+            return None
+
+        primary = self.get_engine(app)
+        key = (app.config['DATABASE_READ_URL'], str(primary.url))
+        if key != self._read_engine_for:
+            if self._read_engine is not None:
+                self._read_engine.dispose()
+            self._read_engine = self._create_read_engine(app, primary)
+            self._read_engine_for = key
+        return self._read_engine
+
+    def _create_read_engine(self, app, primary):
+        options = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        if app.config['DATABASE_READ_URL']:
+            sa_url, options = self.apply_driver_hacks(app, make_url(app.config['DATABASE_READ_URL']), options)
+            return create_engine(sa_url, **options)
+
+        database = primary.url.database
+        if primary.url.get_backend_name() != 'sqlite' or database in (None, '', ':memory:'):
+            return None
+
+        def connect():
+            return sqlite3.connect(f'file:{database}?mode=ro', uri=True, check_same_thread=False,
+                                   factory=cooperative.sqlite_factory(ReadOnlySQLite3Connection))
+
+        options.pop('connect_args', None)
+        options['poolclass'] = TimedQueuePool
+        return create_engine('sqlite://', creator=connect, **options)
@@ -0,0 +1,169 @@
+"""
+Synthetic users, students, teachers, principals and assignments for capacity testing.
+
+Rows are generated in memory and inserted with executemany in batches of `batch_size`, committing every
+`transaction_rows` assignments, so SQLite writes millions of rows a minute. Ids continue after the largest
+already in each table, so seeding adds to an existing database. On Postgres the id sequences are then moved
+past the inserted ids, so the application's own inserts do not reuse them.
+
+Submissions per teacher follow a power law: the teacher of rank k gets a share proportional to 1 / k**skew,
+so skew 0 spreads them evenly and larger values pile them on a few teachers. Students are picked uniformly.
+"""
+import itertools
+import random
+
+from sqlalchemy import func, select
+
+from core.libs import helpers
+from core.models.assignments import Assignment, AssignmentStateEnum, GradeEnum
+from core.models.principals import Principal
+from core.models.students import Student
+from core.models.teachers import Teacher
+from core.models.users import User
+
+DEFAULT_GRADE_WEIGHTS = {GradeEnum.A: 0.3, GradeEnum.B: 0.35, GradeEnum.C: 0.25, GradeEnum.D: 0.1}
+
+
+def parse_weights(text):
+    """{GradeEnum: weight} of a 'A=30,B=40,...' string"""
+    weights = {}
+    for pair in text.split(','):
+        name, _, weight = pair.partition('=')
+        weights[GradeEnum(name.strip().upper())] = float(weight)
+    return weights
+
+
+def power_law_weights(n, skew):
+    """Cumulative weights of ranks 1..n, the k-th proportional to 1 / k**skew"""
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, n + 1)))
+
+
+class Seeder:
+    def __init__(self, engine, batch_size=50000, transaction_rows=1000000, rng=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.transaction_rows = transaction_rows
+        self.rng = rng or random.Random()
+
+    def seed(self, students, teachers, principals, assignments, skew=1.0, grade_weights=None, draft_ratio=0.2,
+             graded_ratio=0.6):
+        """Inserts the given numbers of rows and returns the number inserted per table"""
+        for name, ratio in (('draft_ratio', draft_ratio), ('graded_ratio', graded_ratio)):
+            if not 0 <= ratio <= 1:
+                raise ValueError(f'{name} should be between 0 and 1, got {ratio}')
+
+        with self.engine.begin() as connection:
+            user_id = self._next_id(connection, User)
+            self._insert_users(connection, user_id, students + teachers + principals)
+            student_ids = self._insert_role(connection, Student, students, user_id)
+            teacher_ids = self._insert_role(connection, Teacher, teachers, user_id + students)
+            self._insert_role(connection, Principal, principals, user_id + students + teachers)
+            for model in (User, Student, Teacher, Principal):
+                _advance_sequence(connection, model)
+
+        if assignments:
+            student_ids = student_ids or self._existing_ids(Student)
+            teacher_ids = teacher_ids or self._existing_ids(Teacher)
+            if not student_ids or not teacher_ids:
+                raise ValueError('assignments need at least one student and one teacher')
+            self._insert_assignments(assignments, student_ids, teacher_ids, skew,
+                                     grade_weights or DEFAULT_GRADE_WEIGHTS, draft_ratio, graded_ratio)
+
+        return {'users': students + teachers + principals, 'students': students, 'teachers': teachers,
+                'principals': principals, 'assignments': assignments}
+
+    def _insert_users(self, connection, first_id, count):
+        now = _db_value(connection, User.updated_at, helpers.get_utc_now())
+        self._executemany(connection, User, ('id', 'username', 'email', 'created_at', 'updated_at'), (
+            (_id, f'seed{_id}', f'seed{_id}@fylebe.com', now, now) for _id in range(first_id, first_id + count)
+        ))
+
+    def _insert_role(self, connection, model, count, first_user_id):
+        first_id = self._next_id(connection, model)
+        now = _db_value(connection, model.updated_at, helpers.get_utc_now())
+        ids = list(range(first_id, first_id + count))
+        self._executemany(connection, model, ('id', 'user_id', 'created_at', 'updated_at'), (
+            (_id, first_user_id + offset, now, now) for offset, _id in enumerate(ids)
+        ))
+        return ids
+
+    def _insert_assignments(self, count, student_ids, teacher_ids, skew, grade_weights, draft_ratio, graded_ratio):
+        rng = self.rng
+        # the busiest teachers are picked at random rather than always being the lowest ids
+        ranked_teachers = rng.sample(teacher_ids, len(teacher_ids))
+        teacher_weights = power_law_weights(len(ranked_teachers), skew)
+        graded_below = draft_ratio + (1 - draft_ratio) * graded_ratio
+        columns = ('id', 'student_id', 'teacher_id', 'content', 'grade', 'state', 'created_at', 'updated_at')
+
+        with self.engine.connect() as connection:
+            first_id = self._next_id(connection, Assignment)
+            grades = [_db_value(connection, Assignment.grade, grade) for grade in grade_weights]
+            draft, submitted, graded = (_db_value(connection, Assignment.state, state) for state in (
+                AssignmentStateEnum.DRAFT, AssignmentStateEnum.SUBMITTED, AssignmentStateEnum.GRADED))
+        weights = list(grade_weights.values())
+
+        def rows(first, n, now):
+            for _id, student_id, teacher_id, grade, roll in zip(
+                    range(first, first + n),
+                    rng.choices(student_ids, k=n),
+                    rng.choices(ranked_teachers, cum_weights=teacher_weights, k=n),
+                    rng.choices(grades, weights, k=n),
+                    (rng.random() for _ in range(n))):
+                if roll < draft_ratio:
+                    yield _id, student_id, None, 'seeded content', None, draft, now, now
+                elif roll < graded_below:
+                    yield _id, student_id, teacher_id, 'seeded content', grade, graded, now, now
+                else:
+                    yield _id, student_id, teacher_id, 'seeded content', None, submitted, now, now
+
+        for start in range(0, count, self.transaction_rows):
+            size = min(self.transaction_rows, count - start)
+            with self.engine.begin() as connection:
+                now = _db_value(connection, Assignment.updated_at, helpers.get_utc_now())
+                self._executemany(connection, Assignment, columns, rows(first_id + start, size, now))
+                _advance_sequence(connection, Assignment)
+
+    def _executemany(self, connection, model, columns, rows):
+        """
+        Inserts `rows`, tuples of `columns` already converted for the database, in batches handed straight
+        to the driver: SQLAlchemy's per-row parameter processing would otherwise take most of the time.
+        """
+        compiled = model.__table__.insert().compile(dialect=connection.dialect, column_keys=columns)
+        if compiled.positional:
+            order = [columns.index(key) for key in compiled.positiontup]
+            convert = None if order == list(range(len(columns))) else lambda row: tuple(row[i] for i in order)
+        else:
+            convert = lambda row: dict(zip(columns, row))  # noqa: E731
+
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            connection.exec_driver_sql(compiled.string, batch if convert is None else [convert(row) for row in batch])
+
+    def _existing_ids(self, model):
+        with self.engine.connect() as connection:
+            return list(connection.execute(select(model.__table__.c.id)).scalars())
+
+    @staticmethod
+    def _next_id(connection, model):
+        return (connection.execute(select(func.max(model.__table__.c.id))).scalar() or 0) + 1
+
+
+def _advance_sequence(connection, model):
+    """Moves the Postgres sequence of `model`'s id past the largest id, which the inserts above set explicitly"""
+    if connection.dialect.name != 'postgresql':
+        return
+    table = model.__tablename__
+    # is_called false for an empty table, so its next id is 1
+    connection.exec_driver_sql(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) "
+        f"FROM {table}"
+    )
+
+
+def _db_value(connection, column, value):
+    """`value` as the driver receives it for `column`"""
+    processor = column.type.bind_processor(connection.dialect)
+    return value if processor is None else processor(value)
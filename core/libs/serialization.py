@@ -0,0 +1,76 @@
+"""
+Serializers compiled from marshmallow schemas for the hot response paths.
+
+compile_serializer turns a schema's dump fields into a single generated function that builds the same dict
+as `schema.dump`, keys already sorted, from ORM objects or from row tuples selected with `attributes`.
+dumps encodes responses with orjson when it is installed, and with Flask's encoder otherwise.
+"""
+from flask import json
+from marshmallow import fields
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# fields whose dump is the attribute value itself
+_PASSTHROUGH_FIELDS = (fields.Field, fields.Integer, fields.String)
+
+_compiled = {}
+
+
+class CompiledSerializer:
+    def __init__(self, schema):
+        specs = sorted(
+            (field.data_key or name, field.attribute or name, field)
+            for name, field in schema.dump_fields.items()
+        )
+        self.keys = tuple(key for key, _, _ in specs)
+        self.attributes = tuple(attribute for _, attribute, _ in specs)
+
+        namespace = {'_isoformat': _isoformat}
+        items = []
+        for index, (key, attribute, field) in enumerate(specs):
+            if not attribute.isidentifier():
+                expr = None
+            elif type(field) in _PASSTHROUGH_FIELDS and not getattr(field, 'as_string', False):
+                expr = f'obj.{attribute}'
+            elif type(field) is fields.DateTime and field.format in (None, 'iso'):
+                expr = f'_isoformat(obj.{attribute})'
+            else:
+                expr = None
+
+            if expr is None:
+                namespace[f'_field{index}'] = field
+                expr = f'_field{index}.serialize({attribute!r}, obj)'
+            items.append(f'{key!r}: {expr}')
+
+        source = 'def dump(obj):\n    return {' + ', '.join(items) + '}\n'
+        exec(compile(source, f'<serializer {type(schema).__name__}>', 'exec'), namespace)  # pylint: disable=exec-used
+        self.dump = namespace['dump']
+
+    def dump_many(self, rows):
+        dump = self.dump
+        return [dump(row) for row in rows]
+
+
+def compile_serializer(schema_class):
+    """The serializer of `schema_class`, compiled on first use"""
+    serializer = _compiled.get(schema_class)
+    if serializer is None:
+        serializer = _compiled[schema_class] = CompiledSerializer(schema_class())
+    return serializer
+
+
+def dumps(obj):
+    """Encodes `obj` as JSON bytes; values outside of JSON are encoded as Flask's jsonify would"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+
+_default = json.JSONEncoder().default
+
+
+def _isoformat(value):
+    return None if value is None else value.isoformat()
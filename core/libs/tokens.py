@@ -0,0 +1,92 @@
+"""
+Signed principal tokens for the X-Principal header.
+
+A token is `v1.<payload>.<signature>`: the payload is the principal's claims as compact JSON, the signature an
+HMAC-SHA256 of `v1.<payload>` under PRINCIPAL_TOKEN_SECRET, both base64url without padding. Tokens can carry
+an `exp` claim in unix seconds. Verified claims are kept in an LRU cache, so a principal's repeated requests
+skip both decoding and the signature check; only the expiry is checked every time.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from functools import lru_cache
+
+from . import assertions
+
+VERSION = 'v1'
+CLAIMS = ('user_id', 'student_id', 'teacher_id', 'principal_id')
+
+
+class PrincipalTokens:
+    def __init__(self, secret=None, allow_unsigned=True, cache_size=4096):
+        self.secret = secret.encode() if secret else None
+        self.allow_unsigned = allow_unsigned
+        self._parse = lru_cache(maxsize=cache_size)(self._parse_uncached)
+
+    def sign(self, claims, ttl=None):
+        """A token for `claims`, a dict of CLAIMS, expiring after `ttl` seconds if given"""
+        assertions.assert_valid(self.secret is not None, 'PRINCIPAL_TOKEN_SECRET is not set')
+        claims = {key: value for key, value in claims.items() if key in CLAIMS and value is not None}
+        if ttl is not None:
+            claims['exp'] = int(time.time()) + ttl
+
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        return f'{VERSION}.{payload}.{_b64encode(self._signature(payload))}'
+
+    def verify(self, header):
+        """The (user_id, student_id, teacher_id, principal_id) of an X-Principal header, or a 401"""
+        principal, expires_at = self._parse(header)
+        assertions.assert_auth(expires_at is None or expires_at > time.time(), 'principal token has expired')
+        return principal
+
+    def cache_info(self):
+        return self._parse.cache_info()
+
+    def _parse_uncached(self, header):
+        if header.startswith('{'):
+            assertions.assert_auth(self.allow_unsigned, 'principal should be a signed token')
+            claims = _loads(header)
+        else:
+            version, _, rest = header.partition('.')
+            payload, _, signature = rest.partition('.')
+            assertions.assert_auth(version == VERSION and self.secret is not None, 'principal is invalid')
+            assertions.assert_auth(hmac.compare_digest(_b64decode(signature), self._signature(payload)), 'principal is invalid')
+            claims = _loads(_b64decode(payload))
+
+        principal = tuple(claims.get(key) for key in CLAIMS)
+        expires_at = claims.get('exp')
+        assertions.assert_auth(
+            _is_id(principal[0]) and all(value is None or _is_id(value) for value in principal[1:])
+            and (expires_at is None or _is_id(expires_at)),
+            'principal is invalid'
+        )
+        return principal, expires_at
+
+    def _signature(self, payload):
+        return hmac.new(self.secret, f'{VERSION}.{payload}'.encode(), hashlib.sha256).digest()
+
+
+def _is_id(value):
+    return type(value) is int
+
+
+def _loads(raw):
+    try:
+        claims = json.loads(raw)
+    except ValueError:
+        claims = None
+    assertions.assert_auth(isinstance(claims, dict), 'principal is invalid')
+    return claims
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _b64decode(text):
+    try:
+        return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+    except ValueError:
+        return b''
@@ -0,0 +1,122 @@
+"""
+Request ids and per-phase timing spans.
+
+Every request gets an id: the client's `X-Request-Id` when it is a plausible one, a new uuid otherwise. It is
+echoed in the response's `X-Request-Id`, which gunicorn's access log prints, and kept in `g.request_id` for
+other logs to carry.
+
+Code marks the phases of a request with `span(name)`, or with `record(name, started)` when it already holds a
+perf_counter start. Outside of a request, e.g. on the group committer's thread, both do nothing. With a
+`sink`, each request of at least `min_ms` is written to it as one JSON line once its response, streams
+included, is complete: its id, route, status, duration and spans, each with its start offset and duration
+in ms. The sink is a file that every worker appends to, or '-' for standard error, which gunicorn workers
+share with their master.
+"""
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+
+from flask import g, has_request_context, request
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+_VALID_REQUEST_ID = re.compile(r'[A-Za-z0-9._:-]{1,128}')
+
+
+class Trace:
+    __slots__ = ('request_id', 'started', 'wall_started', 'status', 'spans')
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.status = None
+        self.spans = []
+
+    def add(self, name, started, ended):
+        self.spans.append((name, started - self.started, ended - started))
+
+    def to_dict(self, ended):
+        rule = request.url_rule
+        return {
+            'request_id': self.request_id,
+            'method': request.method,
+            'route': '<unmatched>' if rule is None else rule.rule,
+            'status': self.status,
+            'start': round(self.wall_started, 6),
+            'duration_ms': round((ended - self.started) * 1000, 3),
+            'spans': [{'name': name, 'start_ms': round(offset * 1000, 3), 'duration_ms': round(duration * 1000, 3)}
+                      for name, offset, duration in self.spans],
+        }
+
+
+class span:
+    """Records the time spent in its block as the span `name` of the current request"""
+    __slots__ = ('name', 'trace', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = g.get('trace') if has_request_context() else None
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is not None:
+            self.trace.add(self.name, self.started, time.perf_counter())
+
+
+def record(name, started):
+    """Records the time since `started`, a perf_counter, as the span `name` of the current request"""
+    trace = g.get('trace') if has_request_context() else None
+    if trace is not None:
+        trace.add(name, started, time.perf_counter())
+
+
+class Tracer:
+    def __init__(self, sink=None, min_ms=0):
+        self.sink = sink
+        self.min_seconds = min_ms / 1000
+        self._file = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        @app.before_request
+        def _start_trace():
+            request_id = request.headers.get(REQUEST_ID_HEADER)
+            if request_id is None or not _VALID_REQUEST_ID.fullmatch(request_id):
+                request_id = uuid.uuid4().hex
+            g.request_id = request_id
+            g.trace = Trace(request_id)
+
+        @app.after_request
+        def _send_request_id(response):
+            trace = g.get('trace')
+            if trace is not None:
+                trace.status = response.status_code
+                response.headers[REQUEST_ID_HEADER] = trace.request_id
+            return response
+
+        @app.teardown_request
+        def _end_trace(exc):
+            trace = g.pop('trace', None)
+            if trace is None or self.sink is None:
+                return
+            ended = time.perf_counter()
+            if ended - trace.started >= self.min_seconds:
+                self.export(trace.to_dict(ended))
+
+    def export(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self.sink == '-':
+                sys.stderr.write(line)
+                sys.stderr.flush()
+                return
+            if self._file is None:
+                # O_APPEND writes of a whole line at once do not interleave with other workers' lines
+                self._file = open(self.sink, 'a', buffering=1)
+            self._file.write(line)
@@ -0,0 +1,172 @@
+"""
+Commits for mutating requests. By default every request commits its own transaction. With
+GROUP_COMMIT_ENABLED, a worker's concurrent writes are coalesced instead: a committer thread collects units
+of work for up to GROUP_COMMIT_WINDOW_MS (or GROUP_COMMIT_MAX_BATCH units), runs each in its own SAVEPOINT
+so a failing unit only rolls back itself, and commits them all with a single COMMIT and fsync. Each
+request still gets its own result or exception, and only after that commit is durable.
+
+Units run on the committer thread with its db.session, outside the request context, so they should only
+touch the models and return plain data.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from core import db
+from core.libs import cooperative, tracing
+
+
+def run(unit):
+    """Runs `unit` in a transaction, commits it and returns its result"""
+    if not current_app.config['GROUP_COMMIT_ENABLED']:
+        with tracing.span('model'):
+            result = unit()
+        with tracing.span('commit'):
+            db.session.commit()
+        return result
+
+    # the unit runs on the committer thread, so its model call is part of this span
+    with tracing.span('commit'):
+        return get_committer(current_app._get_current_object()).submit(unit)
+
+# put on a committer's queue to end its thread once the units before it are committed
+_STOP = object()
+
+
+class GroupCommitter:
+    def __init__(self, app, window_ms, max_batch):
+        self.app = app
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.units = 0
+        self._queue = queue.Queue()
+        self._engine = None
+        self._thread = threading.Thread(target=self._loop, name='group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, unit):
+        future = Future()
+        self._queue.put((unit, future))
+        return future.result()
+
+    def stop(self):
+        """Commits the units submitted so far and ends the committer thread"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._engine is not None and self._engine is not db.get_engine(self.app):
+            self._engine.dispose()
+
+    def _loop(self):
+        with self.app.app_context():
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit(batch)
+
+    def _commit(self, batch):
+        session = None
+        outcomes = []
+        try:
+            session = db.create_scoped_session().session_factory(bind=self._get_engine(), binds={})
+            db.session.registry.set(session)
+            for unit, future in batch:
+                savepoint = session.begin_nested()
+                try:
+                    outcomes.append((future, unit(), None))
+                    savepoint.commit()
+                except Exception as err:  # pylint: disable=broad-except
+                    savepoint.rollback()
+                    outcomes.append((future, None, err))
+            session.commit()
+        except Exception as err:  # pylint: disable=broad-except
+            if session is not None:
+                session.rollback()
+            outcomes = [(future, None, error or err) for future, _, error in outcomes]
+            outcomes += [(future, None, err) for _, future in batch[len(outcomes):]]
+        finally:
+            db.session.remove()
+
+        self.batches += 1
+        self.units += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _get_engine(self):
+        if self._engine is None:
+            primary = db.get_engine(self.app)
+            if primary.url.get_backend_name() != 'sqlite':
+                self._engine = primary
+            else:
+                self._engine = _create_sqlite_engine(primary)
+        return self._engine
+
+
+def _create_sqlite_engine(primary):
+    """
+    A private engine for the committer: pysqlite only starts transactions implicitly, before DML, which
+    breaks SAVEPOINTs, so here SQLAlchemy's documented workaround takes transaction control away from the
+    driver and begins each one explicitly, taking the write lock up front.
+    """
+    engine = create_engine(primary.url, poolclass=QueuePool, pool_size=1, max_overflow=0,
+                           connect_args={'check_same_thread': False, 'factory': cooperative.sqlite_factory()})
+
+    @event.listens_for(engine, 'connect')
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _begin_immediate(connection):
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    return engine
+
+
+_committer = None
+_committer_pid = None
+_committer_lock = threading.Lock()
+
+
+def get_committer(app):
+    """The committer of this process, started on first use so that forked workers each get their own"""
+    global _committer, _committer_pid  # pylint: disable=global-statement
+    with _committer_lock:
+        if _committer is None or _committer_pid != os.getpid():
+            _committer = GroupCommitter(
+                app, app.config['GROUP_COMMIT_WINDOW_MS'], app.config['GROUP_COMMIT_MAX_BATCH']
+            )
+            _committer_pid = os.getpid()
+        return _committer
+
+
+def stop_committer():
+    """Stops the committer of this process, if it started one; the next write starts a new one"""
+    global _committer, _committer_pid  # pylint: disable=global-statement
+    with _committer_lock:
+        committer, running = _committer, _committer_pid == os.getpid()
+        _committer = _committer_pid = None
+    if committer is not None and running:
+        committer.stop()
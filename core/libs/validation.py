@@ -0,0 +1,129 @@
+"""
+Payload validators compiled from marshmallow schemas for the hot request paths.
+
+compile_validator reads a schema's load fields once and returns a validator whose `load` accepts the same
+payloads and raises the same ValidationError messages as `schema.load`. Values of the expected JSON type
+are converted inline; anything else (missing, null or malformed values, fields with validators) is handed to
+the field's own `deserialize`, so marshmallow stays the reference for every error. Results are built by
+`make`, by default a `__slots__` object with one attribute per loaded field.
+"""
+from collections.abc import Mapping
+
+from marshmallow import EXCLUDE, INCLUDE, RAISE, ValidationError, fields
+from marshmallow.exceptions import SCHEMA
+from marshmallow.utils import missing
+from marshmallow_enum import EnumField
+
+from core.libs import tracing
+
+
+class Payload:
+    """Base of the result objects of compiled validators"""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        values = ', '.join(f'{key}={getattr(self, key)!r}' for key in self.__slots__ if hasattr(self, key))
+        return f'{type(self).__name__}({values})'
+
+
+class CompiledValidator:
+    def __init__(self, schema, make=None):
+        # post_load hooks are replaced by `make`, any other hook would be skipped
+        hooks = {tag for tag, names in schema._hooks.items() if names} - {('post_load', False), ('post_load', True)}
+        if hooks:
+            raise TypeError(f'{type(schema).__name__} has hooks a compiled validator cannot run: {sorted(hooks)}')
+
+        self.unknown = schema.unknown
+        self.error_messages = schema.error_messages
+        self.fields = [(field.data_key or name, name, _compile_field(name, field)) for name, field in schema.load_fields.items()]
+        self._keys = {key for key, _, _ in self.fields}
+        if make is None:
+            make = type(f'{type(schema).__name__}Payload', (Payload,), {'__slots__': tuple(sorted(schema.load_fields))})
+        self.make = make
+
+    def load(self, data, many=False):
+        with tracing.span('validation'):
+            return self._load_many(data) if many else self._load(data)
+
+    def _load_many(self, data):
+        if not isinstance(data, list):
+            raise ValidationError({SCHEMA: [self.error_messages['type']]}, data=data)
+        loaded, errors = [], {}
+        for index, item in enumerate(data):
+            try:
+                loaded.append(self._load(item))
+            except ValidationError as err:
+                errors[index] = err.messages
+        if errors:
+            raise ValidationError(errors, data=data)
+        return loaded
+
+    def _load(self, data):
+        if not isinstance(data, Mapping):
+            raise ValidationError({SCHEMA: [self.error_messages['type']]}, data=data)
+
+        values, errors = {}, {}
+        for key, name, check in self.fields:
+            try:
+                value = check(data.get(key, missing), data)
+            except ValidationError as err:
+                errors[key] = err.messages
+                continue
+            if value is not missing:
+                values[name] = value
+
+        if self.unknown != EXCLUDE:
+            for key in data.keys() - self._keys:
+                if self.unknown == RAISE:
+                    errors[key] = [self.error_messages['unknown']]
+                elif self.unknown == INCLUDE:
+                    values[key] = data[key]
+
+        if errors:
+            raise ValidationError(errors, data=data, valid_data=values)
+        return self.make(**values)
+
+
+def compile_validator(schema_class, make=None):
+    """A validator loading payloads like `schema_class().load`, building results with `make`"""
+    return CompiledValidator(schema_class(), make)
+
+
+def _compile_field(name, field):
+    deserialize = field.deserialize
+    convert = None if field.validators else _converter(field)
+    if convert is None:
+        return lambda value, data: deserialize(value, name, data)
+
+    if isinstance(convert, dict):
+        def check(value, data):
+            if type(value) is str and value in convert:
+                return convert[value]
+            return deserialize(value, name, data)
+    else:
+        def check(value, data):
+            if type(value) is convert:
+                return value
+            return deserialize(value, name, data)
+
+    return check
+
+
+def _converter(field):
+    """
+    The type whose values the field loads unchanged, or for enums a dict of the accepted strings to their
+    members; None if every value should go through the field.
+    """
+    if type(field) is fields.Integer:
+        return int
+    if type(field) is fields.String:
+        return str
+    if type(field) is EnumField:
+        if field.load_by == EnumField.VALUE:
+            return {member.value: member for member in field.enum if isinstance(member.value, str)} or None
+        return dict(field.enum.__members__)
+    return None
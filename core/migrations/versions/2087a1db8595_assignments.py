@@ -8,11 +8,10 @@ Create Date: 2021-09-16 10:11:14.484440
 from alembic import op
 import sqlalchemy as sa
 from core import db
-from core.apis.decorators import AuthPrincipal
+from core.libs import helpers
 from core.models.users import User
 from core.models.students import Student
 from core.models.teachers import Teacher
-from core.models.assignments import Assignment
 
 # revision identifiers, used by Alembic.
 revision = '2087a1db8595'
@@ -64,38 +63,35 @@ def upgrade():
     db.session.add(teacher_2)
     db.session.flush()
 
-    assignment_1 = Assignment(student_id=student_1.id, content='ESSAY T1')
-    assignment_2 = Assignment(student_id=student_1.id, content='THESIS T1')
-    assignment_3 = Assignment(student_id=student_2.id, content='ESSAY T2')
-    assignment_4 = Assignment(student_id=student_2.id, content='THESIS T2')
-
-    assignment_5 = Assignment(student_id=student_1.id, content='SOLUTION T1')
-
-    db.session.add(assignment_1)
-    db.session.add(assignment_2)
-    db.session.add(assignment_3)
-    db.session.add(assignment_4)
-    db.session.add(assignment_5)
-
-    db.session.flush()
-
-    Assignment.submit(
-        _id=assignment_1.id,
-        teacher_id=teacher_1.id,
-        auth_principal=AuthPrincipal(user_id=student_1.user_id, student_id=student_1.id)
-    )
-
-    Assignment.submit(
-        _id=assignment_3.id,
-        teacher_id=teacher_2.id,
-        auth_principal=AuthPrincipal(user_id=student_2.user_id, student_id=student_2.id)
-    )
-
-    Assignment.submit(
-        _id=assignment_4.id,
-        teacher_id=teacher_2.id,
-        auth_principal=AuthPrincipal(user_id=student_2.user_id, student_id=student_2.id)
+    # seeded through a table stub rather than the Assignment model, which describes the latest schema
+    assignments = sa.table(
+        'assignments',
+        sa.column('student_id', sa.Integer),
+        sa.column('teacher_id', sa.Integer),
+        sa.column('content', sa.Text),
+        sa.column('state', sa.String),
+        sa.column('created_at', sa.TIMESTAMP(timezone=True)),
+        sa.column('updated_at', sa.TIMESTAMP(timezone=True)),
     )
+    now = helpers.get_utc_now()
+
+    def assignment(student, content, teacher=None):
+        return {
+            'student_id': student.id,
+            'teacher_id': teacher.id if teacher else None,
+            'content': content,
+            'state': 'SUBMITTED' if teacher else 'DRAFT',
+            'created_at': now,
+            'updated_at': now,
+        }
+
+    db.session.execute(assignments.insert(), [
+        assignment(student_1, 'ESSAY T1', teacher=teacher_1),
+        assignment(student_1, 'THESIS T1'),
+        assignment(student_2, 'ESSAY T2', teacher=teacher_2),
+        assignment(student_2, 'THESIS T2', teacher=teacher_2),
+        assignment(student_1, 'SOLUTION T1'),
+    ])
 
     db.session.commit()
     # ### end Alembic commands ###
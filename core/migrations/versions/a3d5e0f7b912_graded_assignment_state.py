@@ -0,0 +1,28 @@
+"""graded assignment state
+
+Revision ID: a3d5e0f7b912
+Revises: e4b7c9a21f03
+Create Date: 2024-09-16 09:27:53.104417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d5e0f7b912'
+down_revision = 'e4b7c9a21f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the assignments migration created the state enum before GRADED existed; SQLite stores it as
+    # plain text and needs nothing, PostgreSQL has a real enum type to extend
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TYPE assignmentstateenum ADD VALUE IF NOT EXISTS 'GRADED'")
+
+
+def downgrade():
+    # PostgreSQL cannot drop a value from an enum type
+    pass
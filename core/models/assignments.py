@@ -1,9 +1,14 @@
 import enum
-from core import db
+from collections import defaultdict
+from core import db, query_cache
 from core.apis.decorators import AuthPrincipal
 from core.libs import helpers, assertions
+from core.libs.cache import CALLER_NOTES_CHANGES
+from core.libs.exceptions import FyleError
+from core.libs.pagination import PageRequest
 from core.models.teachers import Teacher
 from core.models.students import Student
+from sqlalchemy import tuple_
 from sqlalchemy.types import Enum as BaseEnum
 
 
@@ -22,6 +27,12 @@ class AssignmentStateEnum(str, enum.Enum):
 
 class Assignment(db.Model):
     __tablename__ = 'assignments'
+    __table_args__ = (
+        # updated_at makes these cover the listing validators, see get_listing_validator
+        db.Index('ix_assignments_student_id_id_updated_at', 'student_id', 'id', 'updated_at'),
+        db.Index('ix_assignments_teacher_id_id_updated_at', 'teacher_id', 'id', 'updated_at'),
+        db.Index('ix_assignments_state_updated_at', 'state', 'updated_at'),
+    )
     id = db.Column(db.Integer, db.Sequence('assignments_id_seq'), primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey(Student.id), nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey(Teacher.id), nullable=True)
@@ -30,6 +41,12 @@ class Assignment(db.Model):
     state = db.Column(BaseEnum(AssignmentStateEnum), default=AssignmentStateEnum.DRAFT, nullable=False)
     created_at = db.Column(db.TIMESTAMP(timezone=True), default=helpers.get_utc_now, nullable=False)
     updated_at = db.Column(db.TIMESTAMP(timezone=True), default=helpers.get_utc_now, nullable=False, onupdate=helpers.get_utc_now)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+
+    # listings are cached per student and per teacher, see core/libs/cache.py
+    cache_owner_columns = ('student_id', 'teacher_id')
 
     def __repr__(self):
         return '<Assignment %r>' % self.id
@@ -43,13 +60,27 @@ class Assignment(db.Model):
     def get_by_id(cls, _id):
         return cls.filter(cls.id == _id).first()
 
+    @classmethod
+    def fetch_page(cls, query, page: PageRequest = None, scope=None, columns=None):
+        """
+        Fetches a page of `query`, cached under `scope`: an owner (column, value), or None for all rows.
+        Given attribute names as `columns`, rows are tuples of just those instead of assignments.
+        """
+        if columns is not None:
+            query = query.with_entities(*(getattr(cls, column) for column in columns))
+        if page is None:
+            return query_cache.get_or_load(db.session, cls.__tablename__, scope, (None, columns), query.all)
+        if page.stream:
+            return page.apply(query, cls.id)
+        return query_cache.get_or_load(
+            db.session, cls.__tablename__, scope, (page.cache_key, columns), lambda: page.apply(query, cls.id)
+        )
+
     @classmethod
     def upsert(cls, assignment_new: 'Assignment'):
         if assignment_new.id is not None:
             assignment = Assignment.get_by_id(assignment_new.id)
-            assertions.assert_found(assignment, 'No assignment with this id was found')
-            assertions.assert_valid(assignment.state == AssignmentStateEnum.DRAFT,
-                                    'only assignment in draft state can be edited')
+            cls.assert_editable(assignment)
 
             assignment.content = assignment_new.content
         else:
@@ -60,22 +91,78 @@ class Assignment(db.Model):
         return assignment
 
     @classmethod
-    def submit(cls, _id, teacher_id, auth_principal: AuthPrincipal):
-        assignment = Assignment.get_by_id(_id)
+    def upsert_many(cls, assignments_new, student_id):
+        """
+        Creates and edits many of a student's assignments at once under the same rules as upsert.
+        New drafts are inserted in one flush and edits applied as one UPDATE. Returns one
+        (id, assignment or FyleError) pair per item, in order.
+        """
+        assignments = cls.get_by_ids([new.id for new in assignments_new if new.id is not None])
+        outcomes = [None] * len(assignments_new)
+        created, pending, seen = {}, {}, set()
+
+        for index, new in enumerate(assignments_new):
+            try:
+                assertions.assert_valid(new.content is not None, 'Content is null ! Content Cannot be null')
+                if new.id is None:
+                    new.student_id = student_id
+                    created[index] = new
+                    continue
+
+                assertions.assert_valid(new.id not in seen, 'assignment appears more than once in this batch')
+                seen.add(new.id)
+                assignment = assignments.get(new.id)
+                cls.assert_editable(assignment)
+                assertions.assert_valid(assignment.student_id == student_id, 'This assignment belongs to some other student')
+            except FyleError as err:
+                outcomes[index] = (new.id, err)
+                continue
+
+            pending[index] = (new.id, assignment.version, {'content': new.content})
+
+        if created:
+            db.session.add_all(created.values())
+            db.session.flush()
+            for index, assignment in created.items():
+                outcomes[index] = (assignment.id, assignment)
+
+        return cls.apply_transitions(outcomes, pending, cls.student_id == student_id, cls.state == AssignmentStateEnum.DRAFT)
+
+    @classmethod
+    def transition(cls, _id, values, *criterion):
+        """
+        Applies `values` to the assignment as a single compare-and-set UPDATE that only matches while
+        `criterion` still holds, and bumps the version. Returns the updated assignment, or None if no row matched.
+        """
+        stmt = db.update(cls).where(cls.id == _id, *criterion).values(
+            version=cls.version + 1, updated_at=helpers.get_utc_now(), **values
+        ).execution_options(synchronize_session=False, **{CALLER_NOTES_CHANGES: True})
+        if db.session.execute(stmt).rowcount != 1:
+            return None
+
+        assignment = cls.get_fresh(_id)
+        query_cache.note_changed(db.session, assignment, values)
+        return assignment
+
+    @classmethod
+    def get_fresh(cls, _id):
+        return db.session.get(cls, _id, populate_existing=True)
+
+    @classmethod
+    def assert_editable(cls, assignment):
+        assertions.assert_found(assignment, 'No assignment with this id was found')
+        assertions.assert_valid(assignment.state == AssignmentStateEnum.DRAFT,
+                                'only assignment in draft state can be edited')
+
+    @classmethod
+    def assert_submittable(cls, assignment, auth_principal: AuthPrincipal):
         assertions.assert_found(assignment, 'No assignment with this id was found')
         assertions.assert_valid(assignment.student_id == auth_principal.student_id, 'This assignment belongs to some other student')
         assertions.assert_valid(assignment.state == AssignmentStateEnum.DRAFT, 'only a draft assignment can be submitted')
         assertions.assert_valid(assignment.content is not None, 'assignment with empty content cannot be submitted')
 
-        assignment.teacher_id = teacher_id
-        assignment.state = AssignmentStateEnum.SUBMITTED
-        db.session.flush()
-
-        return assignment
-
     @classmethod
-    def mark_grade(cls, _id, grade, auth_principal: AuthPrincipal):
-        assignment = Assignment.get_by_id(_id)
+    def assert_gradable(cls, assignment, grade, auth_principal: AuthPrincipal):
         assertions.assert_found(assignment, 'No assignment with this id was found')
         if auth_principal.teacher_id:
             assertions.assert_valid(assignment.teacher_id == auth_principal.teacher_id, f'This assign was supposed to be evaluated by {assignment.teacher_id }')
@@ -84,20 +171,167 @@ class Assignment(db.Model):
         elif auth_principal.principal_id:
             assertions.assert_valid(assignment.state != AssignmentStateEnum.DRAFT, 'Only a submitted or already graded assignment can be graded')
 
-        assignment.grade = grade
-        assignment.state = AssignmentStateEnum.GRADED
-        db.session.flush()
+    @classmethod
+    def grade_criterion(cls, auth_principal: AuthPrincipal):
+        if auth_principal.teacher_id:
+            return [cls.teacher_id == auth_principal.teacher_id, cls.state == AssignmentStateEnum.SUBMITTED]
+        elif auth_principal.principal_id:
+            return [cls.state != AssignmentStateEnum.DRAFT]
+        return []
 
-        return assignment
+    @classmethod
+    def submit(cls, _id, teacher_id, auth_principal: AuthPrincipal):
+        submitted = cls.transition(
+            _id,
+            {'teacher_id': teacher_id, 'state': AssignmentStateEnum.SUBMITTED},
+            cls.student_id == auth_principal.student_id,
+            cls.state == AssignmentStateEnum.DRAFT,
+            cls.content.isnot(None),
+        )
+        if submitted is None:
+            # nothing matched: re-read the row only to report why
+            cls.assert_submittable(cls.get_by_id(_id), auth_principal)
+            assertions.assert_not_stale(False, 'assignment was modified concurrently, please retry')
+
+        return submitted
+
+    @classmethod
+    def submit_many(cls, items, auth_principal: AuthPrincipal):
+        """
+        Submits many assignments at once under the same rules as submit. Returns one (id, assignment or
+        FyleError) pair per item, in order; items failing validation are reported and the rest applied.
+        """
+        assignments = cls.get_by_ids([item.id for item in items])
+        # checked up front: a missing teacher would otherwise fail the foreign key, and the whole batch with it
+        teacher_ids = {_id for _id, in db.session.query(Teacher.id).filter(Teacher.id.in_({item.teacher_id for item in items}))}
+        outcomes = [None] * len(items)
+        pending, seen = {}, set()
+
+        for index, item in enumerate(items):
+            try:
+                assertions.assert_valid(item.id not in seen, 'assignment appears more than once in this batch')
+                seen.add(item.id)
+                assignment = assignments.get(item.id)
+                cls.assert_submittable(assignment, auth_principal)
+                assertions.assert_found(item.teacher_id if item.teacher_id in teacher_ids else None,
+                                        'No teacher with this id was found')
+            except FyleError as err:
+                outcomes[index] = (item.id, err)
+                continue
+
+            pending[index] = (item.id, assignment.version, {'teacher_id': item.teacher_id, 'state': AssignmentStateEnum.SUBMITTED})
+
+        return cls.apply_transitions(
+            outcomes, pending,
+            cls.student_id == auth_principal.student_id,
+            cls.state == AssignmentStateEnum.DRAFT,
+            cls.content.isnot(None),
+        )
+
+    @classmethod
+    def mark_grade(cls, _id, grade, auth_principal: AuthPrincipal):
+        graded = None
+        if grade is not None or not auth_principal.teacher_id:
+            graded = cls.transition(_id, {'grade': grade, 'state': AssignmentStateEnum.GRADED}, *cls.grade_criterion(auth_principal))
+        if graded is None:
+            cls.assert_gradable(cls.get_by_id(_id), grade, auth_principal)
+            assertions.assert_not_stale(False, 'assignment was modified concurrently, please retry')
+
+        return graded
+
+    @classmethod
+    def get_by_ids(cls, ids):
+        return {assignment.id: assignment for assignment in cls.filter(cls.id.in_(ids)).all()}
+
+    @classmethod
+    def apply_transitions(cls, outcomes, pending, *criterion):
+        """
+        Applies validated transitions, `pending` being {index: (id, version, values)}, as a single UPDATE
+        that only matches rows still at the version they were validated at (values that differ per row
+        become a CASE on id), then re-reads the touched rows in one query to fill `outcomes` at each index.
+        Rows changed by someone else in between are reported as a 409.
+        """
+        if not pending:
+            return outcomes
+
+        per_column = defaultdict(dict)
+        for _id, _, values in pending.values():
+            for key, value in values.items():
+                per_column[key][_id] = value
+
+        updates = {}
+        for key, by_id in per_column.items():
+            column = getattr(cls, key)
+            if len(set(by_id.values())) == 1:
+                updates[key] = next(iter(by_id.values()))
+            else:
+                updates[key] = db.case({_id: db.literal(value, column.type) for _id, value in by_id.items()}, value=cls.id, else_=column)
+
+        keys = [(_id, version) for _id, version, _ in pending.values()]
+        stmt = db.update(cls).where(tuple_(cls.id, cls.version).in_(keys), *criterion).values(
+            version=cls.version + 1, updated_at=helpers.get_utc_now(), **updates
+        ).execution_options(synchronize_session=False, **{CALLER_NOTES_CHANGES: True})
+        raced = db.session.execute(stmt).rowcount != len(keys)
+
+        fresh = cls.filter(cls.id.in_([_id for _id, _ in keys])).populate_existing()
+        fresh = {assignment.id: assignment for assignment in fresh}
+        for index, (_id, version, values) in pending.items():
+            assignment = fresh.get(_id)
+            # only when the UPDATE matched fewer rows than expected is it worth checking which ones
+            applied = assignment is not None and (not raced or (
+                assignment.version == version + 1 and all(getattr(assignment, k) == v for k, v in values.items())
+            ))
+            if applied:
+                query_cache.note_changed(db.session, assignment, values)
+            outcomes[index] = (_id, assignment if applied else FyleError(409, 'assignment was modified concurrently, please retry'))
+
+        return outcomes
+
+    @classmethod
+    def mark_grades(cls, items, auth_principal: AuthPrincipal):
+        """
+        Grades many assignments at once under the same rules as mark_grade. Returns one (id, assignment or
+        FyleError) pair per item, in order; items failing validation are reported and the rest applied.
+        """
+        assignments = cls.get_by_ids([item.id for item in items])
+        outcomes = [None] * len(items)
+        pending, seen = {}, set()
+
+        for index, item in enumerate(items):
+            try:
+                assertions.assert_valid(item.id not in seen, 'assignment appears more than once in this batch')
+                seen.add(item.id)
+                assignment = assignments.get(item.id)
+                cls.assert_gradable(assignment, item.grade, auth_principal)
+            except FyleError as err:
+                outcomes[index] = (item.id, err)
+                continue
+
+            pending[index] = (item.id, assignment.version, {'grade': item.grade, 'state': AssignmentStateEnum.GRADED})
+
+        return cls.apply_transitions(outcomes, pending, *cls.grade_criterion(auth_principal))
+
+    @classmethod
+    def get_assignments_by_student(cls, student_id, page: PageRequest = None, columns=None):
+        return cls.fetch_page(cls.filter(cls.student_id == student_id), page, scope=('student_id', student_id), columns=columns)
 
     @classmethod
-    def get_assignments_by_student(cls, student_id):
-        return cls.filter(cls.student_id == student_id).all()
+    def get_listing_validator(cls, column, value):
+        """
+        (scope, row count, last updated_at) of the assignments whose `column` is `value`. Every write bumps
+        updated_at, so this changes whenever the listing does, and is read from the scope's index alone.
+        """
+        count, last_updated = db.session.query(db.func.count(cls.id), db.func.max(cls.updated_at)).filter(
+            getattr(cls, column) == value
+        ).one()
+        return (column, value), count, last_updated
 
     @classmethod
-    def get_assignments_by_teacher(cls, teacher_id):
-        return cls.filter(cls.teacher_id == teacher_id).all()
+    def get_assignments_by_teacher(cls, teacher_id, page: PageRequest = None, columns=None):
+        return cls.fetch_page(cls.filter(cls.teacher_id == teacher_id), page, scope=('teacher_id', teacher_id), columns=columns)
 
     @classmethod
-    def get_all_submitted_and_graded_assignments(cls):
-        return cls.filter(cls.state == AssignmentStateEnum.SUBMITTED, cls.state == AssignmentStateEnum.GRADED).all()
+    def get_all_submitted_and_graded_assignments(cls, page: PageRequest = None, columns=None):
+        # state != DRAFT rather than IN (SUBMITTED, GRADED) keeps the planner on the primary key,
+        # which already yields pages in id order instead of sorting the whole state index range
+        return cls.fetch_page(cls.filter(cls.state != AssignmentStateEnum.DRAFT), page, columns=columns)
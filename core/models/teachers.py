@@ -1,4 +1,4 @@
-from core import db
+from core import db, query_cache
 from core.libs import helpers
 
 
@@ -14,4 +14,4 @@ class Teacher(db.Model):
 
     @classmethod
     def get_all_teachers(cls):
-        return db.session.query(cls).all()
\ No newline at end of file
+        return query_cache.get_or_load(db.session, cls.__tablename__, None, None, db.session.query(cls).all)
@@ -1,6 +1,7 @@
 from flask import jsonify
 from marshmallow.exceptions import ValidationError
-from core import app
+from core import app, cli  # noqa: F401 registers the flask commands
+from core.apis import monitoring
 from core.apis.assignments import student_assignments_resources, teacher_assignments_resources, principal_assignments_resources
 from core.apis.teachers import principal_teachers_resources
 from core.libs import helpers
@@ -8,11 +9,14 @@ from core.libs.exceptions import FyleError
 from werkzeug.exceptions import HTTPException
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
 app.register_blueprint(student_assignments_resources, url_prefix='/student')
 app.register_blueprint(teacher_assignments_resources, url_prefix='/teacher')
 app.register_blueprint(principal_assignments_resources, url_prefix='/principal')
 app.register_blueprint(principal_teachers_resources, url_prefix='/principal')
+app.register_blueprint(monitoring.monitoring_resources)
+monitoring.init_app(app)
 
 
 @app.route('/')
@@ -28,6 +32,7 @@ def ready():
 @app.errorhandler(Exception)
 def handle_error(err):
     if isinstance(err, FyleError):
+        monitoring.FYLE_ERRORS.inc(str(err.status_code))
         return jsonify(
             error=err.__class__.__name__, message=err.message
         ), err.status_code
@@ -39,6 +44,10 @@ def handle_error(err):
         return jsonify(
             error=err.__class__.__name__, message=str(err.orig)
         ), 400
+    elif isinstance(err, StaleDataError):
+        return jsonify(
+            error=err.__class__.__name__, message='resource was modified concurrently, please retry'
+        ), 409
     elif isinstance(err, HTTPException):
         return jsonify(
             error=err.__class__.__name__, message=str(err)
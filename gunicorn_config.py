@@ -1,7 +1,16 @@
 import os
+import re
+import sys
+import tempfile
 
 # https://docs.gunicorn.org/en/stable/settings.html
 
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+if worker_class == 'gevent':
+    # patch before anything imports socket, ssl or threading, so the app and its pools see the patched modules
+    from gevent import monkey
+    monkey.patch_all()
+
 proc_name = 'fyle-interview-be'
 port_number = int(os.environ.get('GUNICORN_PORT', 7755))
 bind = '0.0.0.0:{0}'.format(port_number)
@@ -14,7 +23,6 @@ timeout      = int(os.environ.get('GUNICORN_WORKER_TIMEOUT', 60))
 keepalive    = int(os.environ.get('GUNICORN_KEEPALIVE', 2))
 
 loglevel     = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
-worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
 max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
 max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 20))
 graceful_timeout = int(os.environ.get('GUNICORN_WORKER_GRACEFUL_TIMEOUT', 5))
@@ -34,12 +42,46 @@ tmp_upload_dir = None
 
 errorlog = '-'
 accesslog = '-'
-access_log_format = '%({X-Real-IP}i)s - - - %(t)s.%(T)s "%(r)s" "%(f)s" "%(a)s" %({X-Request-Id}i)s %(L)s %(b)s %(s)s'
+access_log_format = '%({X-Real-IP}i)s - - - %(t)s.%(T)s "%(r)s" "%(f)s" "%(a)s" %({X-Request-Id}o)s %(L)s %(b)s %(s)s'
 # todo - JC: pass org_user_id tpa_id proxy_id and replace the three dashes in above format
 
 
+def on_starting(server):
+    # every worker writes its metrics there, so that a scrape answered by any of them reports the sum of all,
+    # whatever the number of workers is now or after TTIN/TTOU; see core/libs/metrics.py
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if not metrics_dir:
+        metrics_dir = os.environ['METRICS_DIR'] = _default_metrics_dir()
+    if 'core' in sys.modules:
+        # preload_app imported the app before this hook
+        sys.modules['core'].metrics.directory = metrics_dir
+    os.makedirs(metrics_dir, exist_ok=True)
+    # the metrics of a previous run would otherwise be summed with this one's
+    _clear_metrics_dir(metrics_dir)
+
+
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
+    from core import metrics, sampling_profiler
+    metrics.start_flushing()
+    sampling_profiler.start()
+
+
+def post_worker_init(worker):
+    from core import sampling_profiler
+    if sampling_profiler.enabled:
+        # the worker has just reset every signal handler, SIGUSR2 included
+        sampling_profiler.flush_on_signal()
+
+    from core import memory_monitor
+    if memory_monitor.enabled:
+        # gunicorn finishes the current request, exits the worker and spawns a fresh one
+        memory_monitor.recycle = lambda: setattr(worker, 'alive', False)
+
+    from core.apis.decorators import principal_directory
+    if principal_directory.enabled:
+        principal_directory.load()
+        worker.log.info("Principal directory loaded (pid: %s)", worker.pid)
 
 
 def pre_fork(server, worker):
@@ -86,6 +128,10 @@ def child_exit(server, worker):
 def worker_exit(server, worker):
     server.log.info("server: worker_exit is called")
     worker.log.info("worker: worker_exit is called")
+    from core import sampling_profiler
+    if sampling_profiler.enabled:
+        sampling_profiler.stop()
+        sampling_profiler.flush()
 
 
 def nworkers_changed(server, new_value, old_value):
@@ -93,4 +139,29 @@ def nworkers_changed(server, new_value, old_value):
 
 
 def on_exit(server):
-    server.log.info("server: on_exit is called")
\ No newline at end of file
+    server.log.info("server: on_exit is called")
+    metrics_dir = _default_metrics_dir()
+    if os.environ.get('METRICS_DIR') == metrics_dir:
+        _clear_metrics_dir(metrics_dir)
+        try:
+            os.rmdir(metrics_dir)
+        except OSError:
+            pass
+
+
+def _default_metrics_dir():
+    return os.path.join(tempfile.gettempdir(), f'fyle-metrics-{os.getpid()}')
+
+
+# the files core/libs/metrics.py writes: <pid>.json, archive.json, their temporaries and the scrape lock
+_METRICS_FILE = re.compile(r'(\d+|archive)\.json(\.\d+\.tmp)?|\.lock')
+
+
+def _clear_metrics_dir(metrics_dir):
+    # only the registry's own files, in case METRICS_DIR points somewhere shared by mistake
+    for name in os.listdir(metrics_dir):
+        if _METRICS_FILE.fullmatch(name):
+            try:
+                os.remove(os.path.join(metrics_dir, name))
+            except FileNotFoundError:
+                pass
\ No newline at end of file
@@ -30,3 +30,10 @@ def test_assert_valid():
     except FyleError as e:
         assert e.status_code == 400
 
+
+def test_assert_not_stale():
+    try:
+        assertions.assert_not_stale(False)
+    except FyleError as e:
+        assert e.status_code == 409
+        assert e.message == 'CONFLICT'
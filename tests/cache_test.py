@@ -0,0 +1,126 @@
+from unittest.mock import MagicMock
+
+from core import db, query_cache
+from core.models.teachers import Teacher
+from tests import app
+from core.libs.cache import QueryCache
+from core.libs.metrics import Registry
+
+
+def _session():
+    return MagicMock(new=(), dirty=(), deleted=(), info={})
+
+
+def test_cache_hits_misses_and_lru_eviction():
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    session = _session()
+
+    assert cache.get_or_load(session, 'teachers', None, 1, lambda: ['one']) == ['one']
+    assert cache.get_or_load(session, 'teachers', None, 1, lambda: ['other']) == ['one']
+    cache.get_or_load(session, 'teachers', None, 2, lambda: ['two'])
+    cache.get_or_load(session, 'teachers', None, 3, lambda: ['three'])
+
+    assert cache.get_or_load(session, 'teachers', None, 1, lambda: ['reloaded']) == ['reloaded']
+    assert cache.stats() == {'entries': 2, 'hits': 1, 'misses': 4, 'evictions': 2}
+
+
+def test_cache_counters_are_exported():
+    registry = Registry()
+    cache = QueryCache(max_entries=1, ttl_seconds=60, registry=registry)
+    session = _session()
+
+    cache.get_or_load(session, 'teachers', None, 1, lambda: ['one'])
+    cache.get_or_load(session, 'teachers', None, 1, lambda: ['one'])
+    cache.get_or_load(session, 'assignments', None, 1, lambda: ['two'])
+
+    lines = registry.render().splitlines()
+    assert 'query_cache_hits_total{table="teachers"} 1' in lines
+    assert 'query_cache_misses_total{table="teachers"} 1' in lines
+    assert 'query_cache_misses_total{table="assignments"} 1' in lines
+    assert 'query_cache_evictions_total{table="teachers"} 1' in lines
+
+
+def test_cache_ttl_expiry():
+    cache = QueryCache(ttl_seconds=0)
+    session = _session()
+
+    cache.get_or_load(session, 'teachers', None, None, lambda: ['one'])
+    assert cache.get_or_load(session, 'teachers', None, None, lambda: ['two']) == ['two']
+
+
+def test_cache_invalidation_by_owner():
+    cache = QueryCache(ttl_seconds=60)
+    session = _session()
+
+    cache.get_or_load(session, 'assignments', ('student_id', 1), None, lambda: ['mine'])
+    cache.get_or_load(session, 'assignments', ('student_id', 2), None, lambda: ['theirs'])
+    cache.invalidate([('assignments', 'student_id', 1)])
+
+    assert cache.get_or_load(session, 'assignments', ('student_id', 1), None, lambda: ['fresh']) == ['fresh']
+    assert cache.get_or_load(session, 'assignments', ('student_id', 2), None, lambda: ['fresh']) == ['theirs']
+
+    cache.invalidate([('assignments',)])
+    assert cache.get_or_load(session, 'assignments', ('student_id', 2), None, lambda: ['fresh']) == ['fresh']
+
+
+def test_cache_never_keeps_results_read_across_a_commit():
+    cache = QueryCache(ttl_seconds=60)
+    session = _session()
+
+    def load_while_committing():
+        cache.invalidate([('assignments', 'rows')])
+        return ['stale']
+
+    cache.get_or_load(session, 'assignments', None, None, load_while_committing)
+    assert cache.get_or_load(session, 'assignments', None, None, lambda: ['fresh']) == ['fresh']
+
+
+def test_cache_bypassed_with_uncommitted_changes():
+    cache = QueryCache(ttl_seconds=60)
+    session = _session()
+    session.new = (object(),)
+
+    cache.get_or_load(session, 'teachers', None, None, lambda: ['uncommitted'])
+    assert cache.stats()['entries'] == 0
+
+
+def test_listing_invalidated_by_owner_writes(client, h_student_1, h_student_2, monkeypatch):
+    monkeypatch.setattr(query_cache, 'enabled', True)
+    query_cache.clear()
+    client.get('/student/assignments', headers=h_student_1)
+    client.get('/student/assignments', headers=h_student_2)
+    hits = query_cache.hits
+
+    listed = client.get('/student/assignments', headers=h_student_1).json['data']
+    assert query_cache.hits == hits + 1
+
+    created = client.post('/student/assignments', headers=h_student_1, json={'content': 'cached listing'}).json['data']
+    relisted = client.get('/student/assignments', headers=h_student_1).json['data']
+    assert relisted == listed + [created]
+
+    hits = query_cache.hits
+    client.get('/student/assignments', headers=h_student_2)
+    assert query_cache.hits == hits + 1
+
+    client.post('/student/assignments/submit', headers=h_student_1, json={'id': created['id'], 'teacher_id': 1})
+    relisted = client.get('/student/assignments', headers=h_student_1).json['data']
+    assert relisted[-1]['state'] == 'SUBMITTED'
+
+
+def test_cached_instances_are_copied_per_caller(monkeypatch):
+    monkeypatch.setattr(query_cache, 'enabled', True)
+    query_cache.clear()
+    with app.app_context():
+        first = Teacher.get_all_teachers()
+        first[0].user_id = -1
+        db.session.rollback()
+        db.session.remove()
+
+        hits = query_cache.hits
+        second = Teacher.get_all_teachers()
+        assert query_cache.hits == hits + 1 and second[0] is not first[0]
+        assert second[0].user_id != -1
+        # attributes not loaded by the query load from the caller's session instead of raising
+        db.session.expire(second[0], ['created_at'])
+        assert second[0].created_at is not None
+        db.session.remove()
@@ -0,0 +1,59 @@
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from core.libs import cooperative
+from core.libs.routing import ReadOnlySQLite3Connection
+
+
+def test_sqlite_factory_unpatched():
+    assert not cooperative.is_patched()
+    assert cooperative.sqlite_factory() is sqlite3.Connection
+    assert cooperative.sqlite_factory(ReadOnlySQLite3Connection) is ReadOnlySQLite3Connection
+
+
+def test_sqlite_factory_patched():
+    pytest.importorskip('gevent')
+    with patch.object(cooperative, 'is_patched', return_value=True):
+        factory = cooperative.sqlite_factory(ReadOnlySQLite3Connection)
+        assert cooperative.sqlite_factory(ReadOnlySQLite3Connection) is factory
+
+    assert issubclass(factory, cooperative.GreenSQLite3Connection)
+    assert issubclass(factory, ReadOnlySQLite3Connection)
+
+    connection = sqlite3.connect(':memory:', check_same_thread=False, factory=factory)
+    cursor = connection.cursor()
+    assert isinstance(cursor, cooperative.GreenSQLite3Cursor)
+    cursor.execute('CREATE TABLE t (x INTEGER)')
+    cursor.executemany('INSERT INTO t VALUES (?)', [(1,), (2,), (3,)])
+    connection.commit()
+    cursor.execute('SELECT x FROM t ORDER BY x')
+    assert cursor.fetchone() == (1,)
+    assert cursor.fetchall() == [(2,), (3,)]
+    connection.close()
+
+
+def test_green_cursor_offloads_every_fetch():
+    pytest.importorskip('gevent')
+    with patch.object(cooperative, 'is_patched', return_value=True):
+        factory = cooperative.sqlite_factory()
+    connection = sqlite3.connect(':memory:', check_same_thread=False, factory=factory)
+    cursor = connection.cursor()
+    cursor.execute('CREATE TABLE t (x INTEGER)')
+    cursor.executemany('INSERT INTO t VALUES (?)', [(1,), (2,), (3,), (4,)])
+
+    offloaded = []
+
+    def record(func, *args):
+        offloaded.append(func.__name__)
+        return func(*args)
+
+    with patch.object(cooperative, 'offload', side_effect=record):
+        cursor.execute('SELECT x FROM t ORDER BY x')
+        assert cursor.fetchone() == (1,)
+        assert next(cursor) == (2,)
+        assert list(cursor) == [(3,), (4,)]
+
+    assert offloaded == ['execute'] + ['fetchone'] * 5
+    connection.close()
@@ -0,0 +1,104 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from core import db
+from core.libs.directory import PrincipalDirectory
+from core.models.principals import Principal
+from core.models.students import Student
+from core.models.teachers import Teacher
+from core.models.users import User
+from tests import app
+
+
+@pytest.fixture
+def directory():
+    with app.app_context():
+        yield PrincipalDirectory(
+            lambda: db.engine, User, {'student_id': Student, 'teacher_id': Teacher, 'principal_id': Principal},
+            refresh_seconds=0
+        )
+
+
+def test_knows_principals(directory):
+    assert directory.knows(1, student_id=1)
+    assert directory.knows(3, teacher_id=1, student_id=None)
+    assert directory.knows(5, principal_id=1)
+    assert directory.reloads == 1
+
+    assert not directory.knows(2, student_id=1)
+    assert not directory.knows(3, teacher_id=999)
+    assert not directory.knows(999)
+
+
+def test_refresh_picks_up_new_principals(directory):
+    assert directory.knows(1, student_id=1)
+    refreshes = directory.refreshes
+
+    with app.app_context():
+        user = User(username='directory-test', email='directory-test@fylebe.com')
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id)
+        db.session.add(student)
+        db.session.commit()
+        user_id, student_id = user.id, student.id
+
+        try:
+            assert directory.knows(user_id, student_id=student_id)
+            assert directory.refreshes > refreshes and directory.reloads == 1
+        finally:
+            db.session.delete(student)
+            db.session.delete(user)
+            db.session.commit()
+
+    directory.load()
+    assert not directory.knows(user_id, student_id=student_id)
+
+
+def test_misses_refresh_at_most_once_a_second(directory):
+    directory.refresh_seconds = 60
+    assert not directory.knows(2, student_id=1)
+    refreshes = directory.refreshes
+
+    assert not directory.knows(2, student_id=1)
+    assert not directory.knows(3, teacher_id=999)
+    assert directory.refreshes == refreshes
+
+
+def test_first_load_happens_once(directory):
+    threads = [threading.Thread(target=directory.knows, args=(1,), kwargs={'student_id': 1}) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert directory.reloads == 1
+
+
+def test_stale_index_is_reloaded_by_one_thread(directory):
+    directory.refresh_seconds = 60
+    assert directory.knows(1, student_id=1)
+    directory._reloaded_at -= directory.reload_seconds
+
+    # while another thread reloads, requests answer from the current index instead of waiting for it
+    with directory._lock:
+        assert directory.knows(1, student_id=1)
+        assert directory.reloads == 1
+
+    assert directory.knows(1, student_id=1)
+    assert directory.reloads == 2
+
+
+def test_requests_with_unknown_principals(client, h_student_1, directory):
+    directory.enabled = True
+    with patch('core.apis.decorators.principal_directory', directory):
+        response = client.get('/student/assignments', headers=h_student_1)
+        assert response.status_code == 200
+
+        for principal in ({'user_id': 2, 'student_id': 1}, {'user_id': 999, 'student_id': 999}):
+            response = client.get('/student/assignments', headers={'X-Principal': json.dumps(principal)})
+            assert response.status_code == 401
+            assert response.json['message'] == 'principal is invalid'
@@ -0,0 +1,102 @@
+import json
+import logging
+import threading
+import tracemalloc
+
+from flask import Flask
+
+from core.libs import memory
+from core.libs.memory import MemoryMonitor
+from core.libs.metrics import Registry
+
+LEAKED = []
+
+
+def _client(monitor):
+    app = Flask(__name__)
+
+    @app.route('/leak')
+    def leak():
+        LEAKED.append(bytearray(256 * 1024))
+        return 'ok'
+
+    @app.route('/steady')
+    def steady():
+        return str(len(bytearray(256 * 1024)))
+
+    monitor.init_app(app)
+    return app.test_client()
+
+
+def test_memory_monitor_is_not_installed_when_disabled():
+    registry = Registry()
+    monitor = MemoryMonitor(registry, enabled=False)
+    client = _client(monitor)
+
+    client.get('/leak')
+    assert monitor.requests == 0 and registry.metrics == {}
+
+
+def test_memory_monitor_reports_growth_by_route(caplog):
+    registry = Registry()
+    monitor = MemoryMonitor(registry, snapshot_every=4)
+    client = _client(monitor)
+    try:
+        with caplog.at_level(logging.WARNING, logger='core.libs.memory'):
+            # a report every 4 requests, so two of them
+            for _ in range(4):
+                client.get('/leak')
+                client.get('/steady')
+    finally:
+        tracemalloc.stop()
+        LEAKED.clear()
+
+    first, second = [json.loads(record.getMessage()) for record in caplog.records]
+    assert first['requests'] == 4 and first['top_growth'] == []
+    for report in (first, second):
+        assert report['routes']['/leak']['requests'] == 2
+        assert report['routes']['/leak']['retained_bytes'] >= 2 * 256 * 1024
+        assert abs(report['routes']['/steady']['retained_bytes']) < 64 * 1024
+        assert list(report['routes']) == ['/leak', '/steady']
+    assert second['traced_growth_bytes'] >= 2 * 256 * 1024
+    assert 'memory_test.py' in second['top_growth'][0]['site']
+    assert 'process_resident_memory_bytes{pid=' in registry.render()
+
+
+def test_memory_monitor_counts_concurrent_requests(monkeypatch):
+    monitor = MemoryMonitor(Registry(), snapshot_every=100)
+    reports = []
+    monkeypatch.setattr(monitor, 'report', lambda routes, requests: reports.append((routes, requests)))
+    monkeypatch.setattr(memory, 'rss_bytes', lambda: 1 / 0)
+
+    def charge():
+        for _ in range(500):
+            monitor.charge('/steady', 1)
+
+    threads = [threading.Thread(target=charge) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert monitor.requests == 4000 and monitor.routes == {}
+    assert [requests for _, requests in reports] == list(range(100, 4001, 100))
+    assert all(routes == {'/steady': (100, 100)} for routes, _ in reports)
+
+
+def test_memory_monitor_recycles_past_the_limit(monkeypatch):
+    monitor = MemoryMonitor(Registry(), snapshot_every=1, recycle_growth_mb=10)
+    recycled = []
+    monitor.recycle = lambda: recycled.append(True)
+    client = _client(monitor)
+    try:
+        monkeypatch.setattr(memory, 'rss_bytes', lambda: 100 * 1024 * 1024)
+        client.get('/steady')
+        monkeypatch.setattr(memory, 'rss_bytes', lambda: 105 * 1024 * 1024)
+        client.get('/steady')
+        assert recycled == []
+        monkeypatch.setattr(memory, 'rss_bytes', lambda: 111 * 1024 * 1024)
+        client.get('/steady')
+        assert recycled == [True]
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+
+from core.libs.metrics import Registry
+
+
+def test_metrics_render_exposition_format():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ('route', 'status'))
+    in_flight = registry.gauge('in_flight', 'In flight')
+    latency = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1))
+
+    requests.inc('/a', '200')
+    requests.inc('/a', '200', amount=2)
+    requests.inc('/"b"', '500')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, '/a')
+
+    lines = registry.render().splitlines()
+    assert lines[:4] == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{route="/a",status="200"} 3',
+        'requests_total{route="/\\"b\\"",status="500"} 1',
+    ]
+    assert 'in_flight 1' in lines
+    assert '# TYPE latency_seconds histogram' in lines
+    # buckets are cumulative and include their upper bound
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 3.65' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def _registry(directory):
+    registry = Registry(str(directory))
+    return registry, registry.counter('hits_total', 'Hits'), registry.gauge('busy', 'Busy'), \
+        registry.histogram('took_seconds', 'Took', buckets=(1,))
+
+
+def _dead_pid():
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def test_metrics_sum_processes_and_archive_exited_ones(tmp_path):
+    registry, hits, busy, took = _registry(tmp_path)
+    hits.inc(amount=2)
+    busy.inc()
+    took.observe(0.5)
+
+    # a worker that exited with its last values flushed
+    with open(tmp_path / f'{_dead_pid()}.json', 'w') as file:
+        json.dump({'hits_total': [[[], 5]], 'busy': [[[], 3]], 'took_seconds': [[[], [0, 1, 2.0, 1]]]}, file)
+
+    lines = registry.render().splitlines()
+    assert 'hits_total 7' in lines
+    # gauges of exited processes are dropped
+    assert 'busy 1' in lines
+    assert 'took_seconds_bucket{le="+Inf"} 2' in lines
+    assert 'took_seconds_count 2' in lines
+    assert sorted(os.listdir(tmp_path)) == sorted(['.lock', 'archive.json', f'{os.getpid()}.json'])
+
+    # the archive is counted once, however many scrapes follow
+    hits.inc()
+    assert 'hits_total 8' in registry.render().splitlines()
+
+
+def test_metrics_flusher_starts_once_per_process(tmp_path):
+    registry = Registry(str(tmp_path), flush_seconds=3600)
+
+    def flushers():
+        return sum(thread.name == 'metrics-flusher' for thread in threading.enumerate())
+
+    before = flushers()
+    starters = [threading.Thread(target=registry.start_flushing) for _ in range(8)]
+    for starter in starters:
+        starter.start()
+    for starter in starters:
+        starter.join()
+
+    assert flushers() == before + 1
+
+
+def test_metrics_endpoint(client, h_student_1):
+    client.get('/student/assignments', headers=h_student_1)
+    client.get('/no/such/route')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.data.decode()
+    assert 'http_request_duration_seconds_count{blueprint="student_assignments_resources",' \
+           'route="/student/assignments",method="GET"}' in body
+    assert 'http_requests_total{blueprint="",route="<unmatched>",method="GET",status="404"}' in body
+    assert 'response_serialization_seconds_count{route="/student/assignments"}' in body
+    assert '# TYPE db_pool_checkout_wait_seconds histogram' in body
+    assert 'http_requests_in_flight 1' in body
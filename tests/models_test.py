@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 from core.models.assignments import Assignment, GradeEnum, AssignmentStateEnum
 from core.libs import assertions
+from core.libs.exceptions import FyleError
 from core.apis.decorators import AuthPrincipal
 from core.models.teachers import Teacher
 from core.models.students import Student
@@ -54,20 +55,62 @@ def test_upsert_create(mock_db_session, assignment):
 
 @patch('core.models.assignments.db.session')
 def test_submit(mock_db_session, assignment, auth_principal):
-    mock_db_session.query().filter().first.return_value = assignment
+    submitted = Assignment(id=1, student_id=1, teacher_id=2, content="Test content", state=AssignmentStateEnum.SUBMITTED)
+    mock_db_session.execute.return_value.rowcount = 1
+    mock_db_session.get.return_value = submitted
+
     result = Assignment.submit(1, teacher_id=2, auth_principal=auth_principal)
     assert result.state == AssignmentStateEnum.SUBMITTED
     assert result.teacher_id == 2
+    mock_db_session.execute.assert_called_once()
+    mock_db_session.query.assert_not_called()
+
 
 @patch('core.models.assignments.db.session')
-def test_mark_grade_teacher(mock_db_session, assignment, auth_principal_teacher):
+def test_submit_no_match_reports_reason(mock_db_session, assignment, auth_principal):
     assignment.state = AssignmentStateEnum.SUBMITTED
-    assignment.teacher_id = auth_principal_teacher.teacher_id  # Ensure teacher_id matches
+    mock_db_session.execute.return_value.rowcount = 0
+    mock_db_session.query().filter().first.return_value = assignment
+
+    with pytest.raises(FyleError) as excinfo:
+        Assignment.submit(1, teacher_id=2, auth_principal=auth_principal)
+    assert excinfo.value.status_code == 400
+    assert excinfo.value.message == 'only a draft assignment can be submitted'
+
+
+@patch('core.models.assignments.db.session')
+def test_submit_lost_race(mock_db_session, assignment, auth_principal):
+    # the row no longer matched when updated but looks submittable when re-read
+    mock_db_session.execute.return_value.rowcount = 0
     mock_db_session.query().filter().first.return_value = assignment
 
+    with pytest.raises(FyleError) as excinfo:
+        Assignment.submit(1, teacher_id=2, auth_principal=auth_principal)
+    assert excinfo.value.status_code == 409
+
+
+@patch('core.models.assignments.db.session')
+def test_mark_grade_teacher(mock_db_session, assignment, auth_principal_teacher):
+    graded = Assignment(id=1, student_id=1, teacher_id=1, content="Test content", grade=GradeEnum.A, state=AssignmentStateEnum.GRADED)
+    mock_db_session.execute.return_value.rowcount = 1
+    mock_db_session.get.return_value = graded
+
     result = Assignment.mark_grade(1, GradeEnum.A, auth_principal_teacher)
     assert result.grade == GradeEnum.A
     assert result.state == AssignmentStateEnum.GRADED
+    mock_db_session.execute.assert_called_once()
+
+
+@patch('core.models.assignments.db.session')
+def test_mark_grade_teacher_no_match_reports_reason(mock_db_session, assignment, auth_principal_teacher):
+    assignment.state = AssignmentStateEnum.SUBMITTED
+    assignment.teacher_id = 2
+    mock_db_session.execute.return_value.rowcount = 0
+    mock_db_session.query().filter().first.return_value = assignment
+
+    with pytest.raises(FyleError) as excinfo:
+        Assignment.mark_grade(1, GradeEnum.A, auth_principal_teacher)
+    assert excinfo.value.message == 'This assign was supposed to be evaluated by 2'
 
 @patch('core.models.assignments.db.session')
 def test_get_assignments_by_student(mock_db_session, assignment):
@@ -118,4 +118,21 @@ def test_grade_or_regrade_assignments(client, h_principal):
         
         assert response.status_code == 200
         assert response.json['data']['id'] == 1
-        assert response.json['data']['grade'] == 'A'
\ No newline at end of file
+        assert response.json['data']['grade'] == 'A'
+
+def test_grade_or_regrade_assignments_bulk(client, h_principal, h_student_1):
+    draft = client.post('/student/assignments', headers=h_student_1, json={'content': 'draft'}).json['data']
+
+    response = client.post(
+        '/principal/assignments/grade/bulk',
+        headers=h_principal,
+        json=[{'id': 1, 'grade': 'C'}, {'id': draft['id'], 'grade': 'A'}]
+    )
+
+    assert response.status_code == 200
+    results = response.json['data']
+    assert results[0]['status_code'] == 200
+    assert results[0]['data']['grade'] == 'C'
+    assert results[0]['data']['state'] == 'GRADED'
+    assert results[1]['status_code'] == 400
+    assert results[1]['message'] == 'Only a submitted or already graded assignment can be graded'
@@ -0,0 +1,123 @@
+import os
+import pstats
+import signal
+import threading
+import time
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from core.libs.profiling import OTHER_STACKS, RequestProfiler, SamplingProfiler
+
+
+def _app(profiler):
+    app = Flask(__name__)
+
+    def slow_sum():
+        return sum(range(10000))
+
+    @app.route('/work')
+    def work():
+        return str(slow_sum())
+
+    profiler.init_app(app)
+    return app
+
+
+def test_profiling_is_not_installed_without_token():
+    app = _app(RequestProfiler(None, '/nonexistent'))
+
+    assert not app.before_request_funcs and not app.teardown_request_funcs
+    assert 'X-Profile-File' not in app.test_client().get('/work', headers={'X-Profile': 'anything'}).headers
+
+
+def test_profiling_requires_the_token(tmp_path):
+    client = _app(RequestProfiler('secret', str(tmp_path))).test_client()
+
+    assert 'X-Profile-File' not in client.get('/work').headers
+    assert 'X-Profile-File' not in client.get('/work', headers={'X-Profile': 'wrong'}).headers
+    # the token would be written to the access log with the query string
+    assert 'X-Profile-File' not in client.get('/work?profile=secret').headers
+    assert os.listdir(tmp_path) == []
+
+
+def test_profiling_writes_pstats_and_collapsed_stacks(tmp_path):
+    client = _app(RequestProfiler('secret', str(tmp_path))).test_client()
+
+    name = client.get('/work', headers={'X-Profile': 'secret'}).headers['X-Profile-File']
+    assert os.path.dirname(name) == '' and name.endswith('.pstats')
+    path = os.path.join(tmp_path, name)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert 'slow_sum' in functions
+
+    name = client.get('/work?profile_format=collapsed', headers={'X-Profile': 'secret'}).headers['X-Profile-File']
+    assert name.endswith('.collapsed')
+    path = os.path.join(tmp_path, name)
+    with open(path) as profile:
+        stacks = [line.rsplit(' ', 1) for line in profile.read().splitlines()]
+    assert any(stack.endswith(';sum') and stack.split(';')[-2].startswith('slow_sum (') for stack, _ in stacks)
+    assert all(int(microseconds) > 0 for _, microseconds in stacks)
+
+
+def test_profilers_pause_while_their_greenlet_is_switched_out():
+    profiler = RequestProfiler('secret', '/nonexistent')
+    mine, other = object(), object()
+    profile = MagicMock()
+    profiler._greenlets[mine] = profile
+
+    profiler._switched('switch', (mine, other))
+    profile.disable.assert_called_once()
+    profiler._switched('switch', (other, mine))
+    profile.enable.assert_called_once()
+
+
+def _wait_in_sampled_function(release):
+    release.wait()
+
+
+def test_sampling_profiler_counts_collapsed_stacks(tmp_path):
+    sampler = SamplingProfiler(str(tmp_path), max_stacks=100)
+    release = threading.Event()
+    thread = threading.Thread(target=_wait_in_sampled_function, args=(release,))
+    thread.start()
+    try:
+        sampler.sample()
+        sampler.sample()
+    finally:
+        release.set()
+        thread.join()
+
+    waiting = [(stack, count) for stack, count in sampler.stacks.items() if '_wait_in_sampled_function (' in stack]
+    assert len(waiting) == 1 and waiting[0][1] == 2
+    assert waiting[0][0].startswith('_bootstrap (threading.py:')
+
+    path = sampler.flush()
+    assert sampler.stacks == {} and sampler.flush() is None
+    with open(path) as output:
+        assert f'{waiting[0][0]} 2\n' in output.read()
+
+
+def test_sampling_profiler_bounds_its_stacks(tmp_path):
+    sampler = SamplingProfiler(str(tmp_path), max_stacks=1)
+    sampler.stacks['seen'] = 1
+    sampler.sample()
+
+    assert set(sampler.stacks) == {'seen', OTHER_STACKS}
+
+
+def test_sampling_profiler_flushes_on_signal(tmp_path):
+    sampler = SamplingProfiler(str(tmp_path), hz=200, flush_seconds=3600)
+    previous = signal.getsignal(signal.SIGUSR2)
+    sampler.flush_on_signal()
+    try:
+        sampler.start()
+        time.sleep(0.05)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        deadline = time.monotonic() + 5
+        while not os.listdir(tmp_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+        sampler.stop()
+
+    assert [name.endswith('.collapsed') for name in os.listdir(tmp_path)] == [True]
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from sqlalchemy import create_engine, text
+
+from core import app, query_stats
+from core.libs.querystats import bind_shape, normalize
+
+
+def test_normalize_groups_statements_by_shape():
+    assert normalize('SELECT *\n  FROM assignments WHERE id IN (?, ?, ?) LIMIT 10') == \
+        'SELECT * FROM assignments WHERE id IN (?, ...) LIMIT ?'
+    assert normalize("UPDATE t SET a = %(a)s, b = 'x''y' WHERE c::text = :c") == \
+        'UPDATE t SET a = ?, b = ? WHERE c::text = ?'
+    assert bind_shape((1, 'a', None), False) == ['int', 'str', 'NoneType']
+    assert bind_shape([{'id': 1}, {'id': 2}], True) == {'rows': 2, 'row': {'id': 'int'}}
+
+
+def test_server_timing_header(client, h_student_1):
+    response = client.get('/student/assignments', headers=h_student_1)
+
+    assert response.status_code == 200
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+
+
+def test_slow_and_repeated_statements_are_logged(caplog, monkeypatch):
+    monkeypatch.setattr(query_stats, 'slow_seconds', 0)
+    monkeypatch.setattr(query_stats, 'repeat_limit', 2)
+    engine = create_engine('sqlite://')
+
+    with caplog.at_level(logging.WARNING, logger='core.libs.querystats'):
+        with app.test_request_context('/student/assignments'):
+            with engine.connect() as connection:
+                for value in range(3):
+                    connection.execute(text('SELECT :value'), {'value': value})
+            queries = query_stats.current()
+            assert queries.count == 3
+            assert queries.slowest_statement == 'SELECT ?'
+            response = app.process_response(app.response_class())
+
+    records = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [record['event'] for record in records] == ['slow_query'] * 3 + ['repeated_statement']
+    assert records[0]['binds'] == ['int']
+    assert records[0]['route'] == '/student/assignments'
+    assert records[-1]['statement'] == 'SELECT ?' and records[-1]['count'] == 3
+    assert 'desc="3 queries"' in response.headers['Server-Timing']
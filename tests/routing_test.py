@@ -0,0 +1,52 @@
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from core import app, db
+from core.apis.decorators import AuthPrincipal
+from core.libs.routing import RecentWriters
+
+
+def test_reads_use_read_engine():
+    with app.test_request_context('/student/assignments', method='GET'):
+        read_engine = db.get_read_engine()
+        assert read_engine is not None
+        assert db.session.get_bind() is read_engine
+        db.session.remove()
+
+
+def test_writes_use_primary():
+    with app.test_request_context('/student/assignments', method='POST'):
+        assert db.session.get_bind() is db.engine
+        db.session.remove()
+
+
+def test_read_engine_is_read_only():
+    with app.app_context():
+        with db.get_read_engine().connect() as connection:
+            assert connection.execute(text('SELECT count(*) FROM assignments')).scalar() > 0
+            with pytest.raises(OperationalError):
+                connection.execute(text("DELETE FROM assignments WHERE id = -1"))
+
+
+def test_reads_after_recent_write_stay_on_primary(monkeypatch):
+    writers = RecentWriters(window=60)
+    monkeypatch.setattr(db, 'recent_writers', writers)
+    writers.note(1)
+
+    with app.test_request_context('/student/assignments', method='GET'):
+        g.principal = AuthPrincipal(user_id=1, student_id=1)
+        assert db.session.get_bind() is db.engine
+        db.session.remove()
+
+    with app.test_request_context('/student/assignments', method='GET'):
+        g.principal = AuthPrincipal(user_id=2, student_id=2)
+        assert db.session.get_bind() is db.get_read_engine()
+        db.session.remove()
+
+
+def test_read_sees_own_write(client, h_student_1):
+    created = client.post('/student/assignments', headers=h_student_1, json={'content': 'read my write'}).json['data']
+
+    listed = client.get('/student/assignments', headers=h_student_1, query_string={'limit': 1000}).json['data']
+    assert created['id'] in [assignment['id'] for assignment in listed]
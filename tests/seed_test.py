@@ -0,0 +1,88 @@
+import random
+from collections import Counter
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from core import db
+from core.libs import seeding
+from core.models.assignments import Assignment, AssignmentStateEnum, GradeEnum
+from core.models.students import Student
+from core.models.teachers import Teacher
+from core.models.users import User
+from tests import app
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/seed.sqlite3')
+    db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_seed(engine):
+    seeder = seeding.Seeder(engine, batch_size=300, transaction_rows=1000, rng=random.Random(1))
+    counts = seeder.seed(50, 10, 2, 5000, skew=2.0, grade_weights={GradeEnum.A: 1, GradeEnum.D: 3})
+    assert counts == {'users': 62, 'students': 50, 'teachers': 10, 'principals': 2, 'assignments': 5000}
+
+    with engine.connect() as connection:
+        rows = connection.execute(select(Assignment.__table__)).all()
+        teachers = connection.execute(select(Teacher.__table__.c.user_id)).scalars().all()
+        users = connection.execute(select(User.__table__.c.id)).scalars().all()
+
+    assert len(rows) == 5000 and sorted(row.id for row in rows) == list(range(1, 5001))
+    assert set(teachers) <= set(users)
+    for row in rows:
+        assert (row.teacher_id is None) == (row.state == AssignmentStateEnum.DRAFT.name)
+        assert (row.grade is not None) == (row.state == AssignmentStateEnum.GRADED.name)
+
+    per_teacher = sorted(Counter(row.teacher_id for row in rows if row.teacher_id).values(), reverse=True)
+    assert per_teacher[0] > 10 * per_teacher[-1]
+    grades = Counter(row.grade for row in rows if row.grade)
+    assert set(grades) == {'A', 'D'} and grades['D'] > grades['A']
+
+
+def test_seed_adds_to_existing_rows(engine):
+    seeding.Seeder(engine).seed(5, 2, 1, 10)
+    counts = seeding.Seeder(engine).seed(0, 0, 0, 20)
+    assert counts['assignments'] == 20
+
+    with engine.connect() as connection:
+        assert sorted(connection.execute(select(Assignment.__table__.c.id)).scalars()) == list(range(1, 31))
+        assert len(connection.execute(select(Student.__table__.c.id)).all()) == 5
+
+
+def test_seed_needs_students_and_teachers(engine):
+    with pytest.raises(ValueError):
+        seeding.Seeder(engine).seed(3, 0, 0, 10)
+
+
+@pytest.mark.parametrize('ratios', [{'draft_ratio': -0.1}, {'graded_ratio': 1.5}])
+def test_seed_rejects_ratios_outside_0_and_1(engine, ratios):
+    with pytest.raises(ValueError):
+        seeding.Seeder(engine).seed(3, 1, 0, 10, **ratios)
+
+    with engine.connect() as connection:
+        assert connection.execute(select(User.__table__.c.id)).all() == []
+
+
+def test_seed_advances_postgres_sequences():
+    connection = Mock()
+    connection.dialect.name = 'postgresql'
+    seeding._advance_sequence(connection, Assignment)  # pylint: disable=protected-access
+
+    statement = connection.exec_driver_sql.call_args.args[0]
+    assert "setval(pg_get_serial_sequence('assignments', 'id')" in statement
+    assert statement.endswith('FROM assignments')
+
+    connection.dialect.name = 'sqlite'
+    seeding._advance_sequence(connection, Assignment)  # pylint: disable=protected-access
+    assert connection.exec_driver_sql.call_count == 1
+
+
+def test_seed_command_rejects_bad_grades():
+    result = app.test_cli_runner().invoke(args=['seed', '--grades', 'A=1,E=2'])
+    assert result.exit_code == 2
+    assert 'Invalid value for --grades' in result.output
@@ -0,0 +1,42 @@
+import json
+from unittest.mock import patch
+
+from flask import json as flask_json
+
+from core.apis.assignments.schema import AssignmentSchema, assignment_serializer
+from core.apis.teachers.schema import TeacherSchema
+from core.libs import serialization
+from core.models.assignments import Assignment, AssignmentStateEnum, GradeEnum
+from core.models.teachers import Teacher
+from tests import app
+
+
+def _parity(serializer, schema, rows):
+    for row in rows:
+        expected = json.loads(flask_json.dumps(schema.dump(row)))
+        assert json.loads(serialization.dumps(serializer.dump(row))) == expected
+    assert serializer.dump_many(rows) == schema.dump(rows, many=True)
+
+
+def test_assignment_serializer_parity():
+    with app.app_context():
+        assignments = Assignment.filter().all()
+        rows = Assignment.filter().with_entities(*(getattr(Assignment, a) for a in assignment_serializer.attributes)).all()
+        unsaved = Assignment(id=1000, student_id=1, content=None, grade=GradeEnum.B, state=AssignmentStateEnum.GRADED)
+        _parity(assignment_serializer, AssignmentSchema(), assignments + rows + [unsaved])
+
+
+def test_compiled_serializer_of_other_schemas():
+    with app.app_context():
+        _parity(serialization.compile_serializer(TeacherSchema), TeacherSchema(), Teacher.get_all_teachers())
+
+    assert serialization.compile_serializer(TeacherSchema) is serialization.compile_serializer(TeacherSchema)
+
+
+def test_dumps_without_orjson():
+    data = {'data': [{'id': 1, 'state': AssignmentStateEnum.DRAFT}], 'next_cursor': None}
+
+    with patch.object(serialization, 'orjson', None), app.app_context():
+        encoded = serialization.dumps(data)
+
+    assert json.loads(encoded) == json.loads(serialization.dumps(data)) == {'data': [{'id': 1, 'state': 'DRAFT'}], 'next_cursor': None}
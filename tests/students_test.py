@@ -1,3 +1,13 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from core.libs.pagination import encode_cursor
+from core.models.assignments import Assignment
+
+
 def test_get_assignments_student_1(client, h_student_1):
     response = client.get(
         '/student/assignments',
@@ -83,6 +93,7 @@ def test_submit_assignment_student_1(client, h_student_1):
     submitted_assignment = response_submit.json['data']
     assert submitted_assignment['state'] == 'SUBMITTED'
     assert submitted_assignment['teacher_id'] == 2
+    assert submitted_assignment['version'] == created_assignment['version'] + 1
 
 
 
@@ -163,4 +174,150 @@ def test_submit_assignment_student_1_my(client, h_student_1):
         assert response.status_code == 400
         data = response.json
         assert data['error'] == 'FyleError'
-        assert data['message'] == 'only a draft assignment can be submitted'
\ No newline at end of file
+        assert data['message'] == 'only a draft assignment can be submitted'
+
+
+def test_get_assignments_paginated(client, h_student_1):
+    full = client.get('/student/assignments', headers=h_student_1).json
+    assert full['next_cursor'] is None
+
+    ids, cursor = [], None
+    while True:
+        params = {'limit': 2}
+        if cursor:
+            params['cursor'] = cursor
+        response = client.get('/student/assignments', headers=h_student_1, query_string=params)
+
+        assert response.status_code == 200
+        assert len(response.json['data']) <= 2
+        ids.extend(assignment['id'] for assignment in response.json['data'])
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == [assignment['id'] for assignment in full['data']]
+
+
+def test_get_assignments_bad_page_params(client, h_student_1):
+    response = client.get('/student/assignments', headers=h_student_1, query_string={'limit': 0})
+    assert response.status_code == 400
+    assert response.json['error'] == 'FyleError'
+
+    response = client.get('/student/assignments', headers=h_student_1, query_string={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert response.json['message'] == 'cursor is invalid'
+
+
+@pytest.mark.parametrize('values', [[{'a': 1}], [[1]], [None], [True], ['1'], [1.5], [1, 2]])
+def test_get_assignments_tampered_cursor(client, h_student_1, values):
+    response = client.get('/student/assignments', headers=h_student_1,
+                          query_string={'cursor': encode_cursor(values)})
+
+    assert response.status_code == 400
+    assert response.json['message'] == 'cursor is invalid'
+
+
+def test_get_assignments_ndjson_stream(client, h_student_1):
+    listed = client.get('/student/assignments', headers=h_student_1).json['data']
+
+    response = client.get('/student/assignments', headers={**h_student_1, 'Accept': 'application/x-ndjson'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert streamed == listed
+
+
+def test_upsert_and_submit_assignments_bulk(client, h_student_1, h_student_2):
+    response = client.post(
+        '/student/assignments/bulk',
+        headers=h_student_1,
+        json=[{'content': 'bulk one'}, {'content': 'bulk two'}, {'content': None}]
+    )
+
+    assert response.status_code == 200
+    results = response.json['data']
+    assert [result['status_code'] for result in results] == [200, 200, 400]
+    first, second = results[0]['data'], results[1]['data']
+    assert first['state'] == 'DRAFT' and first['student_id'] == 1 and first['content'] == 'bulk one'
+
+    response = client.post(
+        '/student/assignments/bulk',
+        headers=h_student_1,
+        json=[{'id': first['id'], 'content': 'bulk one edited'}, {'id': second['id'], 'content': 'bulk two edited'}]
+    )
+    results = response.json['data']
+    assert [result['data']['content'] for result in results] == ['bulk one edited', 'bulk two edited']
+    assert results[0]['data']['version'] == first['version'] + 1
+
+    response = client.post(
+        '/student/assignments/bulk',
+        headers=h_student_2,
+        json=[{'id': first['id'], 'content': 'not mine'}]
+    )
+    assert response.json['data'][0]['message'] == 'This assignment belongs to some other student'
+
+    response = client.post(
+        '/student/assignments/submit/bulk',
+        headers=h_student_1,
+        json=[{'id': first['id'], 'teacher_id': 1}, {'id': second['id'], 'teacher_id': 2}, {'id': 2, 'teacher_id': 1}]
+    )
+    results = response.json['data']
+    assert [result['status_code'] for result in results] == [200, 200, 400]
+    assert results[0]['data']['state'] == 'SUBMITTED' and results[0]['data']['teacher_id'] == 1
+    assert results[1]['data']['teacher_id'] == 2
+    assert results[2]['message'] == 'only a draft assignment can be submitted'
+
+
+def test_submit_assignments_bulk_unknown_teacher(client, h_student_1):
+    drafts = client.post(
+        '/student/assignments/bulk',
+        headers=h_student_1,
+        json=[{'content': 'bulk known teacher'}, {'content': 'bulk unknown teacher'}]
+    ).json['data']
+
+    response = client.post(
+        '/student/assignments/submit/bulk',
+        headers=h_student_1,
+        json=[{'id': drafts[0]['data']['id'], 'teacher_id': 1}, {'id': drafts[1]['data']['id'], 'teacher_id': 1000000}]
+    )
+
+    assert response.status_code == 200
+    results = response.json['data']
+    assert [result['status_code'] for result in results] == [200, 404]
+    assert results[0]['data']['state'] == 'SUBMITTED'
+    assert results[1]['message'] == 'No teacher with this id was found'
+    assert Assignment.get_by_id(drafts[1]['data']['id']).state == 'DRAFT'
+
+
+def test_get_assignments_conditional(client, h_student_1):
+    response = client.get('/student/assignments', headers=h_student_1)
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and etag.startswith('W/')
+
+    with patch.object(Assignment, 'get_assignments_by_student') as mock_get_assignments:
+        response = client.get('/student/assignments', headers={**h_student_1, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag and response.data == b''
+        mock_get_assignments.assert_not_called()
+
+    response = client.get('/student/assignments', headers={**h_student_1, 'If-None-Match': etag}, query_string={'limit': 1})
+    assert response.status_code == 200
+
+    client.post('/student/assignments', headers=h_student_1, json={'content': 'conditional'})
+    response = client.get('/student/assignments', headers={**h_student_1, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json['data'][-1]['content'] == 'conditional'
+
+
+def test_get_assignments_if_modified_since(client, h_student_2):
+    later = datetime.utcnow() + timedelta(minutes=1)
+    since = later.strftime('%a, %d %b %Y %H:%M:%S GMT')
+    # a listing changed within the current second gets no Last-Modified, so move the clock past it
+    with patch('core.apis.responses.helpers.get_utc_now', return_value=later):
+        response = client.get('/student/assignments', headers={**h_student_2, 'If-Modified-Since': since})
+    assert response.status_code == 304
+
+    response = client.get('/student/assignments', headers={**h_student_2, 'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'})
+    assert response.status_code == 200
@@ -1,4 +1,9 @@
-from core.models.assignments import GradeEnum, AssignmentStateEnum
+from unittest.mock import patch
+
+from core.apis.decorators import AuthPrincipal
+from core.libs.exceptions import FyleError
+from core.libs.helpers import GeneralObject
+from core.models.assignments import Assignment, GradeEnum, AssignmentStateEnum
 import pytest
 
 @pytest.fixture
@@ -34,6 +39,17 @@ def test_get_assignments_teacher_2(client, h_teacher_2):
         assert assignment['state'] in ['SUBMITTED', 'GRADED']
 
 
+def test_get_assignments_teacher_conditional(client, h_teacher_2):
+    etag = client.get('/teacher/assignments', headers=h_teacher_2).headers['ETag']
+
+    response = client.get('/teacher/assignments', headers={**h_teacher_2, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.get('/teacher/assignments', headers={**h_teacher_2, 'If-None-Match': etag, 'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+
+
 def test_grade_assignment_cross(client, h_teacher_2):
     """
     failure case: assignment 1 was submitted to teacher 1 and not teacher 2
@@ -292,3 +308,66 @@ def test_get_assignments_invalid_endpoint(client, h_teacher_1):
     assert response.status_code == 404
     data = response.json
     assert data['error'] == 'NotFound'
+
+
+def _create_submitted_assignment(client, h_student_1, teacher_id=1):
+    created = client.post('/student/assignments', headers=h_student_1, json={'content': 'bulk content'}).json['data']
+    client.post('/student/assignments/submit', headers=h_student_1, json={'id': created['id'], 'teacher_id': teacher_id})
+    return created['id']
+
+
+def test_grade_assignments_bulk(client, h_student_1, h_teacher_1):
+    first = _create_submitted_assignment(client, h_student_1)
+    second = _create_submitted_assignment(client, h_student_1)
+    other_teachers = _create_submitted_assignment(client, h_student_1, teacher_id=2)
+
+    response = client.post(
+        '/teacher/assignments/grade/bulk',
+        headers=h_teacher_1,
+        json=[
+            {'id': first, 'grade': GradeEnum.A.value},
+            {'id': second, 'grade': GradeEnum.B.value},
+            {'id': first, 'grade': GradeEnum.C.value},
+            {'id': other_teachers, 'grade': GradeEnum.A.value},
+            {'id': 100000, 'grade': GradeEnum.A.value},
+        ]
+    )
+
+    assert response.status_code == 200
+    results = response.json['data']
+    assert [result['id'] for result in results] == [first, second, first, other_teachers, 100000]
+    assert [result['status_code'] for result in results] == [200, 200, 400, 400, 404]
+    assert results[0]['data']['grade'] == GradeEnum.A.value
+    assert results[0]['data']['state'] == AssignmentStateEnum.GRADED.value
+    assert results[1]['data']['grade'] == GradeEnum.B.value
+    assert results[2]['message'] == 'assignment appears more than once in this batch'
+    assert results[3]['message'] == 'This assign was supposed to be evaluated by 2'
+
+    # a second pass finds them graded, under the same rule as the single grade endpoint
+    response = client.post('/teacher/assignments/grade/bulk', headers=h_teacher_1, json=[{'id': first, 'grade': 'B'}])
+    assert response.json['data'][0]['message'] == 'Only a submitted assignment can be graded'
+
+
+def test_grade_assignments_bulk_bad_payload(client, h_teacher_1):
+    response = client.post('/teacher/assignments/grade/bulk', headers=h_teacher_1, json=[{'id': 1, 'grade': 'AB'}])
+    assert response.status_code == 400
+    assert response.json['error'] == 'ValidationError'
+
+    response = client.post('/teacher/assignments/grade/bulk', headers=h_teacher_1, json={'id': 1, 'grade': 'A'})
+    assert response.status_code == 400
+    assert response.json['error'] == 'FyleError'
+
+
+def test_grade_assignments_bulk_concurrent_change(client, h_student_1):
+    assignment_id = _create_submitted_assignment(client, h_student_1)
+    # validated against a version someone else has since moved past
+    stale = Assignment(id=assignment_id, student_id=1, teacher_id=1, state=AssignmentStateEnum.SUBMITTED, version=0)
+
+    with client.application.app_context(), patch.object(Assignment, 'get_by_ids', return_value={assignment_id: stale}):
+        outcomes = Assignment.mark_grades(
+            [GeneralObject(id=assignment_id, grade=GradeEnum.A)],
+            AuthPrincipal(user_id=3, teacher_id=1)
+        )
+
+    assert isinstance(outcomes[0][1], FyleError)
+    assert outcomes[0][1].status_code == 409
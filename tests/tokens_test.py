@@ -0,0 +1,74 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from core.libs.exceptions import FyleError
+from core.libs.tokens import PrincipalTokens
+from tests import app
+
+
+@pytest.fixture
+def tokens():
+    return PrincipalTokens('test-secret', allow_unsigned=False, cache_size=16)
+
+
+def test_sign_and_verify(tokens):
+    token = tokens.sign({'user_id': 1, 'student_id': 1, 'teacher_id': None})
+
+    assert tokens.verify(token) == (1, 1, None, None)
+    assert tokens.verify(token) == (1, 1, None, None)
+    assert tokens.cache_info().hits == 1
+
+
+@pytest.mark.parametrize('mangle', [
+    lambda token: token[:-2] + ('AA' if not token.endswith('AA') else 'BB'),
+    lambda token: token.replace('v1.', 'v2.'),
+    lambda token: 'v1.' + PrincipalTokens('other-secret').sign({'user_id': 1}).split('.', 1)[1],
+    lambda token: 'v1.not-base64!.x',
+    lambda token: json.dumps({'user_id': 1, 'student_id': 1}),
+    lambda token: '{not json',
+])
+def test_verify_rejects(tokens, mangle):
+    with pytest.raises(FyleError) as error:
+        tokens.verify(mangle(tokens.sign({'user_id': 1, 'student_id': 1})))
+    assert error.value.status_code == 401
+
+
+def test_verify_expiry_checked_on_cache_hits(tokens):
+    token = tokens.sign({'user_id': 1, 'principal_id': 1}, ttl=60)
+    assert tokens.verify(token) == (1, None, None, 1)
+
+    with patch('core.libs.tokens.time.time', return_value=10 ** 10), pytest.raises(FyleError) as error:
+        tokens.verify(token)
+    assert error.value.message == 'principal token has expired'
+
+
+def test_unsigned_principals():
+    tokens = PrincipalTokens(allow_unsigned=True)
+
+    assert tokens.verify('{"user_id": 1, "teacher_id": 2}') == (1, None, 2, None)
+    for header in ('{"student_id": 1}', '{"user_id": "1"}', '[1]'):
+        with pytest.raises(FyleError):
+            tokens.verify(header)
+
+
+def test_signed_principal_requests(client, tokens):
+    with patch('core.apis.decorators.principal_tokens', tokens):
+        response = client.get('/student/assignments', headers={'X-Principal': tokens.sign({'user_id': 1, 'student_id': 1})})
+        assert response.status_code == 200
+
+        response = client.get('/student/assignments', headers={'X-Principal': json.dumps({'user_id': 1, 'student_id': 1})})
+        assert response.status_code == 401
+        assert response.json['message'] == 'principal should be a signed token'
+
+        response = client.get('/teacher/assignments', headers={'X-Principal': tokens.sign({'user_id': 1, 'student_id': 1})})
+        assert response.status_code == 403
+
+
+def test_principal_token_command(tokens):
+    with patch('core.cli.principal_tokens', tokens):
+        result = app.test_cli_runner().invoke(args=['principal-token', '--user-id', '3', '--teacher-id', '1'])
+
+    assert result.exit_code == 0
+    assert tokens.verify(result.output.strip()) == (3, None, 1, None)
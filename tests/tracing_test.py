@@ -0,0 +1,46 @@
+import json
+
+from core import tracer
+
+
+def test_request_id_is_generated_or_accepted(client, h_student_1):
+    generated = client.get('/student/assignments', headers=h_student_1).headers['X-Request-Id']
+    assert len(generated) == 32
+
+    response = client.get('/student/assignments', headers={**h_student_1, 'X-Request-Id': 'abc-123'})
+    assert response.headers['X-Request-Id'] == 'abc-123'
+
+    response = client.get('/student/assignments', headers={**h_student_1, 'X-Request-Id': 'bad id'})
+    assert response.headers['X-Request-Id'] != 'bad id'
+
+
+def test_spans_are_exported(client, h_principal, tmp_path, monkeypatch):
+    sink = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracer, 'sink', str(sink))
+    monkeypatch.setattr(tracer, '_file', None)
+
+    # assignment 8 is already graded A, so regrading it changes nothing
+    response = client.post('/principal/assignments/grade', json={'id': 8, 'grade': 'A'},
+                           headers={**h_principal, 'X-Request-Id': 'grade-1'})
+    tracer._file.close()
+
+    records = [json.loads(line) for line in sink.read_text().splitlines()]
+    assert len(records) == 1
+    record = records[0]
+    assert record['request_id'] == 'grade-1'
+    assert record['route'] == '/principal/assignments/grade'
+    assert record['status'] == response.status_code == 200
+    assert [span['name'] for span in record['spans']] == ['payload', 'auth', 'validation', 'model', 'commit',
+                                                          'serialization']
+    for span in record['spans']:
+        assert 0 <= span['start_ms'] <= record['duration_ms']
+
+
+def test_spans_are_written_to_stderr(client, h_student_1, capsys, monkeypatch):
+    monkeypatch.setattr(tracer, 'sink', '-')
+
+    client.get('/student/assignments', headers={**h_student_1, 'X-Request-Id': 'stderr-1'})
+
+    record = json.loads(capsys.readouterr().err)
+    assert record['request_id'] == 'stderr-1'
+    assert record['route'] == '/student/assignments'
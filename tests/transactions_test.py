@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core import db
+from core.libs import assertions, transactions
+from core.libs.exceptions import FyleError
+from core.models.assignments import Assignment, AssignmentStateEnum
+from tests import app
+
+
+def _insert(content, fail=False):
+    def unit():
+        db.session.add(Assignment(student_id=1, content=content))
+        db.session.flush()
+        assertions.assert_valid(not fail, 'unit failed')
+        return content
+
+    return unit
+
+
+def test_group_commit_rolls_back_only_the_failing_unit():
+    committer = transactions.GroupCommitter(app, window_ms=500, max_batch=3)
+    units = [_insert('group commit one'), _insert('group commit two', fail=True), _insert('group commit three')]
+
+    try:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(committer.submit, unit) for unit in units]
+    finally:
+        committer.stop()
+
+    assert futures[0].result() == 'group commit one'
+    assert futures[2].result() == 'group commit three'
+    with pytest.raises(FyleError) as error:
+        futures[1].result()
+    assert error.value.message == 'unit failed'
+    assert (committer.batches, committer.units) == (1, 3)
+
+    with app.app_context():
+        contents = {a.content for a in Assignment.filter(Assignment.content.like('group commit %')).all()}
+    assert contents == {'group commit one', 'group commit three'}
+
+
+def test_group_commit_requests(client, h_student_1, monkeypatch):
+    monkeypatch.setitem(app.config, 'GROUP_COMMIT_ENABLED', True)
+    try:
+        def post(path, payload):
+            return client.post(path, headers=h_student_1, json=payload)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            drafts = list(executor.map(post, ['/student/assignments'] * 4, [{'content': f'grouped {i}'} for i in range(4)]))
+            assert [response.status_code for response in drafts] == [200] * 4
+
+            submits = list(executor.map(post, ['/student/assignments/submit'] * 5, [
+                {'id': response.json['data']['id'], 'teacher_id': 1} for response in drafts
+            ] + [{'id': 1000000, 'teacher_id': 1}]))
+    finally:
+        transactions.stop_committer()
+
+    assert [response.status_code for response in submits] == [200] * 4 + [404]
+    with app.app_context():
+        for response in submits[:4]:
+            assert Assignment.get_by_id(response.json['data']['id']).state == AssignmentStateEnum.SUBMITTED
+
+
+def test_group_commit_stop_commits_pending_units():
+    committer = transactions.GroupCommitter(app, window_ms=60000, max_batch=10)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(committer.submit, _insert('stopped before committing'))
+        while not committer._queue.unfinished_tasks:  # pylint: disable=protected-access
+            time.sleep(0.001)
+        committer.stop()
+
+    assert future.result() == 'stopped before committing'
+    assert not committer._thread.is_alive()  # pylint: disable=protected-access
@@ -0,0 +1,97 @@
+import pytest
+from marshmallow import EXCLUDE, RAISE, Schema, ValidationError, fields, validate
+
+from core.apis.assignments.schema import (
+    AssignmentGradeSchema, AssignmentSchema, AssignmentSubmitSchema,
+    assignment_grade_validator, assignment_submit_validator, assignment_validator,
+)
+from core.libs.validation import compile_validator
+from core.models.assignments import Assignment, GradeEnum
+
+PAYLOADS = [
+    {'id': 1, 'teacher_id': 2, 'grade': 'A', 'content': 'essay'},
+    {'id': '7', 'teacher_id': 2.0, 'grade': 'D', 'content': 'essay'},
+    {'id': None, 'teacher_id': None, 'grade': None, 'content': None},
+    {},
+    {'id': True, 'teacher_id': 'two', 'grade': 'a', 'content': 5},
+    {'id': 10 ** 400, 'teacher_id': [], 'grade': 1, 'content': b'bytes'},
+    {'id': 1.5, 'grade': '__class__', 'state': 'GRADED', 'student_id': 9, 'unknown': 'ignored'},
+    [],
+    'not an object',
+    None,
+]
+
+
+def _load(load, payload, **kwargs):
+    try:
+        return load(payload, **kwargs), None
+    except ValidationError as err:
+        return None, err.messages
+
+
+@pytest.mark.parametrize('schema_class,validator', [
+    (AssignmentSchema, assignment_validator),
+    (AssignmentSubmitSchema, assignment_submit_validator),
+    (AssignmentGradeSchema, assignment_grade_validator),
+])
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_validator_parity(schema_class, validator, payload):
+    expected, expected_errors = _load(schema_class().load, payload)
+    loaded, errors = _load(validator.load, payload)
+
+    assert errors == expected_errors
+    if expected is not None:
+        assert isinstance(loaded, Assignment) == (schema_class is AssignmentSchema)
+        for name in schema_class().load_fields:
+            assert getattr(loaded, name, 'unset') == getattr(expected, name, 'unset')
+
+
+def test_validator_parity_many():
+    payload = [{'id': 1, 'grade': 'A'}, {'id': 'x', 'grade': 'Z'}, 'not an object']
+
+    assert _load(assignment_grade_validator.load, payload, many=True)[1] == _load(AssignmentGradeSchema().load, payload, many=True)[1]
+    assert _load(assignment_grade_validator.load, {}, many=True)[1] == _load(AssignmentGradeSchema().load, {}, many=True)[1]
+
+    loaded = assignment_grade_validator.load([{'id': 1, 'grade': 'B'}], many=True)
+    assert (loaded[0].id, loaded[0].grade) == (1, GradeEnum.B)
+
+
+def test_validator_result_has_slots():
+    loaded = assignment_submit_validator.load({'id': 1, 'teacher_id': 2})
+
+    assert not hasattr(loaded, '__dict__')
+    assert repr(loaded) == 'AssignmentSubmitSchemaPayload(id=1, teacher_id=2)'
+
+
+def test_validator_field_validators_and_unknown():
+    class StrictSchema(Schema):
+        class Meta:
+            unknown = RAISE
+
+        name = fields.String(required=True, validate=validate.Length(max=3))
+        count = fields.Integer(load_default=0)
+
+    validator = compile_validator(StrictSchema)
+    for payload in ({'name': 'abcd'}, {'name': 'abc', 'extra': 1}, {'name': 'ab'}):
+        loaded, errors = _load(validator.load, payload)
+        expected, expected_errors = _load(StrictSchema().load, payload)
+        assert errors == expected_errors
+        if expected is not None:
+            assert (loaded.name, loaded.count) == (expected['name'], expected['count'])
+
+
+def test_validator_rejects_unsupported_hooks():
+    from marshmallow import validates_schema
+
+    class HookedSchema(Schema):
+        class Meta:
+            unknown = EXCLUDE
+
+        id = fields.Integer()
+
+        @validates_schema
+        def check(self, data, **kwargs):
+            pass
+
+    with pytest.raises(TypeError):
+        compile_validator(HookedSchema)